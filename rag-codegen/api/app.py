@@ -1,30 +1,123 @@
+import time
+
+# Reported by /ready; heavy imports are deferred, so this should stay small
+_IMPORT_START = time.perf_counter()
+
+import asyncio
+import importlib
+import json
+import threading
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
-
-from pipeline.rag_pipeline import RAGPipeline
+from typing import Optional, Dict, Any, List
 
+# pipeline.rag_pipeline (sentence-transformers, torch, faiss) is imported
+# lazily by Components, so the server can answer /health right away.
 from reviewer.testcases import get_test_cases
-from reviewer.ai_testgen import AITestGenerator
 from reviewer.executor import CodeExecutor
 from reviewer.validator import CodeValidator
+from reviewer.review_cache import ReviewCache
 from reviewer.utils import extract_function_name
 from reviewer.sanitizer import sanitize_python_code, CodeSanitizationError
 from reviewer.oracles.registry import get_oracle
-
-app = FastAPI(
-    title="RAG-Based Code Generation & Review API",
-    description="Retrieval-Augmented Code Generation with Automated Code Review",
-    version="2.0.0"
-)
+from utils import tracing
+from utils.logger import log_run, close_run_logger
 
 # -----------------------------
 # Initialize Core Components
 # -----------------------------
-rag_pipeline = RAGPipeline()
-executor = CodeExecutor()
+class Components:
+    """
+    Builds the heavy RAG pipeline on first use (once, thread-safe) and
+    runs the startup warmup, recording how long each step took.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rag_pipeline = None
+        self.status = "starting"
+        self.error = None
+        self.timings = {}
+
+    def _timed(self, name, fn):
+        start = time.perf_counter()
+        result = fn()
+        self.timings[name] = round(time.perf_counter() - start, 3)
+        return result
+
+    @property
+    def loaded(self):
+        return self._rag_pipeline is not None
+
+    def rag_pipeline(self):
+        if self._rag_pipeline is None:
+            with self._lock:
+                if self._rag_pipeline is None:
+                    module = self._timed(
+                        "pipeline_import_s",
+                        lambda: importlib.import_module("pipeline.rag_pipeline")
+                    )
+                    self._rag_pipeline = self._timed("pipeline_init_s", module.RAGPipeline)
+        return self._rag_pipeline
+
+    def warmup(self):
+        """
+        Loads the pipeline, then runs a dummy embed + search and starts the
+        sandbox workers, so the first real request pays none of it.
+        """
+        self.status = "warming"
+        start = time.perf_counter()
+        try:
+            pipeline = self.rag_pipeline()
+            vector = self._timed(
+                "warmup_embed_s", lambda: pipeline.embed_batcher.embed_one("warmup")
+            )
+            self._timed(
+                "warmup_search_s",
+                lambda: pipeline.retriever.retrieve(vector, top_k=1, query_text="warmup")
+            )
+            if executor.pool is not None:
+                self._timed("warmup_sandbox_s", executor.pool.start)
+            self.status = "ready"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+        self.timings["warmup_total_s"] = round(time.perf_counter() - start, 3)
+        print(f"[startup] {self.status}: {self.timings}", flush=True)
+
+    async def get_rag_pipeline(self):
+        # Waits (off the event loop) if warmup is still loading it
+        if self._rag_pipeline is not None:
+            return self._rag_pipeline
+        return await asyncio.to_thread(self.rag_pipeline)
+
+
+components = Components()
+executor = CodeExecutor(time_budget_s=10.0)
 validator = CodeValidator()
-ai_testgen = AITestGenerator()
+review_cache = ReviewCache.from_env()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve /health immediately; /ready flips once warmup finishes
+    threading.Thread(target=components.warmup, name="warmup", daemon=True).start()
+    yield
+    if components.loaded:
+        await components.rag_pipeline().aclose()
+    await asyncio.to_thread(executor.close)
+    await asyncio.to_thread(close_run_logger)
+
+
+app = FastAPI(
+    title="RAG-Based Code Generation & Review API",
+    description="Retrieval-Augmented Code Generation with Automated Code Review",
+    version="2.0.0",
+    lifespan=lifespan
+)
 
 # -----------------------------
 # Request Schemas
@@ -33,12 +126,16 @@ class GenerateRequest(BaseModel):
     task: str
     language: Optional[str] = "Python"
     use_rag: Optional[bool] = True
+    use_cache: Optional[bool] = True
+    include_timings: Optional[bool] = False
 
 
 class GenerateAndReviewRequest(BaseModel):
     task: str
     language: Optional[str] = "Python"
     use_rag: Optional[bool] = True
+    use_cache: Optional[bool] = True
+    include_timings: Optional[bool] = False
 
 
 # -----------------------------
@@ -49,6 +146,8 @@ class GenerateResponse(BaseModel):
     explanation: str
     use_rag: bool
     intent: str
+    context_packing: Optional[Dict[str, Any]] = None
+    timings: Optional[Dict[str, float]] = None
 
 
 class GenerateAndReviewResponse(BaseModel):
@@ -56,6 +155,7 @@ class GenerateAndReviewResponse(BaseModel):
     explanation: str
     intent: str
     review: Dict[str, Any]
+    timings: Optional[Dict[str, float]] = None
 
 
 # -----------------------------
@@ -66,6 +166,31 @@ def health_check():
     return {"status": "ok"}
 
 
+# -----------------------------
+# Readiness (model + index loaded, warmed up)
+# -----------------------------
+@app.get("/ready")
+def readiness_check():
+    body = {
+        "status": components.status,
+        "timings": {"app_import_s": APP_IMPORT_S, **components.timings},
+    }
+    if components.error:
+        body["error"] = components.error
+    return JSONResponse(body, status_code=200 if components.status == "ready" else 503)
+
+
+# -----------------------------
+# Prometheus Metrics
+# -----------------------------
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(
+        tracing.render_metrics(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
 # -----------------------------
 # Root
 # -----------------------------
@@ -74,7 +199,9 @@ def root():
     return {
         "message": "RAG-Based Code Generation & Review API",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "ready": "/ready",
+        "metrics": "/metrics"
     }
 
 
@@ -82,38 +209,149 @@ def root():
 # Code Generation Only
 # -----------------------------
 @app.post("/generate", response_model=GenerateResponse)
-def generate_code(request: GenerateRequest):
-    output = rag_pipeline.run(
-        user_task=request.task,
-        language=request.language,
-        use_rag=request.use_rag
-    )
+async def generate_code(request: GenerateRequest):
+    rag_pipeline = await components.get_rag_pipeline()
+    with tracing.trace("generate") as timings:
+        output = await rag_pipeline.arun(
+            user_task=request.task,
+            language=request.language,
+            use_rag=request.use_rag,
+            use_cache=request.use_cache
+        )
+
+    # Enqueued for the background writer; never blocks the response
+    log_run({
+        "endpoint": "generate",
+        "task": request.task,
+        "language": request.language,
+        "use_rag": request.use_rag,
+        "intent": output["intent"],
+        "cached": output["cached"],
+        "generated_code": output["code"],
+        "context_packing": output["context_packing"],
+        "timings": timings,
+    })
 
     return GenerateResponse(
         code=output["code"],
         explanation=output["explanation"],
         use_rag=output["use_rag"],
-        intent=output["intent"]
+        intent=output["intent"],
+        context_packing=output["context_packing"],
+        timings=timings if request.include_timings else None
     )
 
 
+# -----------------------------
+# Streaming Code Generation (SSE)
+# -----------------------------
+STREAM_DONE_FIELDS = ("code", "explanation", "use_rag", "intent", "context_packing", "ttft_ms")
+
+
+@app.post("/generate/stream")
+async def generate_code_stream(request: GenerateRequest):
+    """
+    Server-Sent Events: `code` / `explanation` events carry text deltas,
+    a final `done` event carries the cleaned output and ttft_ms.
+    """
+
+    rag_pipeline = await components.get_rag_pipeline()
+
+    async def event_stream():
+        try:
+            async for event, data in rag_pipeline.astream(
+                user_task=request.task,
+                language=request.language,
+                use_rag=request.use_rag,
+                use_cache=request.use_cache
+            ):
+                if event == "done":
+                    # Same fields as /generate; never the raw retrieved context
+                    payload = {field: data.get(field) for field in STREAM_DONE_FIELDS}
+                else:
+                    payload = {"text": data}
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 # -----------------------------
 # Code Generation + Review
 # -----------------------------
+def _run_review(
+    code: str,
+    function_name: str,
+    canonical_tests: List[Dict[str, Any]],
+    use_cache: bool = True
+) -> Dict[str, Any]:
+    """
+    Blocking sandbox execution + validation; run off the event loop.
+    A repeat of the same (code AST, function, tests) is served from the
+    review cache without executing anything.
+    """
+    if review_cache is not None and use_cache:
+        with tracing.span("review_cache"):
+            cached = review_cache.get(code, function_name, canonical_tests)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+    canonical_results = executor.run_tests(
+        code=code,
+        function_name=function_name,
+        test_cases=canonical_tests
+    )
+
+    review_report = validator.validate(
+        execution_results=canonical_results,
+        test_cases=canonical_tests
+    )
+
+    # Per-request bypass still refreshes the entry with the new report
+    if review_cache is not None:
+        review_cache.set(code, function_name, canonical_tests, review_report)
+    return {**review_report, "cached": False}
+
+
 @app.post("/generate-and-review", response_model=GenerateAndReviewResponse)
-def generate_and_review(request: GenerateAndReviewRequest):
+async def generate_and_review(request: GenerateAndReviewRequest):
+    with tracing.trace("generate_and_review") as timings:
+        response = await _generate_and_review(request)
+
+    log_run({
+        "endpoint": "generate_and_review",
+        "task": request.task,
+        "language": request.language,
+        "use_rag": request.use_rag,
+        "intent": response.intent,
+        "generated_code": response.code,
+        "review_status": response.review.get("status"),
+        "review": response.review,
+        "timings": timings,
+    })
+
+    if request.include_timings:
+        response.timings = timings
+    return response
+
+
+async def _generate_and_review(request: GenerateAndReviewRequest) -> GenerateAndReviewResponse:
 
     # 1. Generate code
-    output = rag_pipeline.run(
+    rag_pipeline = await components.get_rag_pipeline()
+    output = await rag_pipeline.arun(
         user_task=request.task,
         language=request.language,
-        use_rag=request.use_rag
+        use_rag=request.use_rag,
+        use_cache=request.use_cache
     )
 
     raw_code = output["code"]
 
     try:
-        code = sanitize_python_code(raw_code)
+        with tracing.span("sanitize"):
+            code = sanitize_python_code(raw_code)
     except CodeSanitizationError as e:
         return GenerateAndReviewResponse(
             code=raw_code,
@@ -159,17 +397,9 @@ def generate_and_review(request: GenerateAndReviewRequest):
         for tc in canonical_tests:
             tc["expected"] = oracle.expected(**tc.get("input", {}))
 
-    # 4. Execute ONLY canonical tests
-    canonical_results = executor.run_tests(
-        code=code,
-        function_name=function_name,
-        test_cases=canonical_tests
-    )
-
-    # 5. Validate ONLY canonical results
-    review_report = validator.validate(
-        execution_results=canonical_results,
-        test_cases=canonical_tests
+    # 4-5. Execute and validate ONLY canonical tests (in a worker thread)
+    review_report = await asyncio.to_thread(
+        _run_review, code, function_name, canonical_tests, request.use_cache
     )
 
     return GenerateAndReviewResponse(
@@ -178,3 +408,6 @@ def generate_and_review(request: GenerateAndReviewRequest):
         intent=intent,
         review=review_report
     )
+
+
+APP_IMPORT_S = round(time.perf_counter() - _IMPORT_START, 3)
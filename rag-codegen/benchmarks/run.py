@@ -0,0 +1,367 @@
+"""
+Micro-benchmarks for the ingestion, retrieval and review hot paths:
+chunk_code, Embedder.embed, FAISSIndex.search, sanitize_python_code,
+CodeExecutor.run_tests and CodeValidator.validate.
+
+Runs offline on synthetic inputs with a hashing stub in place of the
+embedding model (or a small local model via --model), and records
+throughput, latency percentiles and peak Python memory as JSON:
+
+    python -m benchmarks.run --sizes 1000,100000 --output benchmarks/baseline.json
+    python -m benchmarks.run --sizes 1000,100000 --compare benchmarks/baseline.json
+
+--samples sets the distinct inputs per benchmark; --sizes only applies
+to faiss_search (corpus sizes searched). Each measurement cycles over
+its inputs for at least --min-calls calls and --min-time seconds, and
+is repeated --repeats times; reported metrics are medians over the
+repeats, with their relative spread.
+
+Compare mode exits non-zero when a metric gets worse by more than its
+threshold (THRESHOLDS, or --threshold for all) and by more than
+NOISE_MULTIPLIER times the spread seen in either run.
+"""
+import argparse
+import json
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.synthetic import (
+    HashingEncoder,
+    synthetic_chunks,
+    synthetic_documents,
+    synthetic_source,
+)
+from ingestion.chunker import chunk_code
+from reviewer.sanitizer import sanitize_python_code
+from reviewer.testcases import get_test_cases
+from reviewer.validator import CodeValidator
+from vectorstore.benchmark_index import synthetic_vectors
+
+BENCHMARKS = ["chunk_code", "embed", "faiss_search", "sanitize", "run_tests", "validate"]
+
+# Compare mode: higher is better for throughput, lower for the rest.
+# p99 is recorded but too noisy to gate on.
+HIGHER_IS_BETTER = {"throughput_per_s"}
+REPORTED_METRICS = ["throughput_per_s", "p50_ms", "p95_ms", "p99_ms", "peak_mb"]
+
+# Relative change counted as a regression, per gated metric; tails are noisier
+THRESHOLDS = {"throughput_per_s": 0.15, "p50_ms": 0.15, "p95_ms": 0.25, "peak_mb": 0.10}
+# A change must also exceed this multiple of the run-to-run spread
+NOISE_MULTIPLIER = 3.0
+
+MIN_CALLS = 50
+MIN_TIME_S = 0.5
+REPEATS = 5
+
+SUM_FIRST_N = "def sum_first_n(n):\n    return n * (n + 1) // 2\n"
+
+
+def _timed_pass(fn, inputs, min_calls, min_time_s):
+    latencies = []
+    start = time.perf_counter()
+    i = 0
+    # Cycle over the inputs so tiny input sets still give stable percentiles
+    while i < len(inputs) or i < min_calls or time.perf_counter() - start < min_time_s:
+        x = inputs[i % len(inputs)]
+        t0 = time.perf_counter()
+        fn(x)
+        latencies.append(time.perf_counter() - t0)
+        i += 1
+    return latencies, time.perf_counter() - start
+
+
+def _measure(fn, inputs, items_per_call=1, warmup=3):
+    """
+    Times fn over inputs in REPEATS passes, each followed by a short
+    pass under tracemalloc for peak memory (so tracing does not skew
+    latency). Returns the median of each metric over the passes and
+    its spread, (max - min) / median.
+    """
+    for x in inputs[:warmup]:
+        fn(x)
+
+    passes = []
+    for _ in range(REPEATS):
+        latencies, elapsed = _timed_pass(fn, inputs, MIN_CALLS, MIN_TIME_S)
+
+        tracemalloc.start()
+        for x in inputs[:max(1, min(len(inputs), 20))]:
+            fn(x)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies_ms = np.array(latencies) * 1000
+        passes.append({
+            "calls": len(latencies),
+            "throughput_per_s": len(latencies) * items_per_call / elapsed,
+            "p50_ms": float(np.percentile(latencies_ms, 50)),
+            "p95_ms": float(np.percentile(latencies_ms, 95)),
+            "p99_ms": float(np.percentile(latencies_ms, 99)),
+            "peak_mb": peak / 2**20,
+        })
+
+    result = {"calls": int(np.median([p["calls"] for p in passes])), "repeats": len(passes)}
+    spread = {}
+    for metric in REPORTED_METRICS:
+        values = [p[metric] for p in passes]
+        median = float(np.median(values))
+        result[metric] = round(median, 4)
+        spread[metric] = round((max(values) - min(values)) / median, 4) if median else 0.0
+    result["spread"] = spread
+    return result
+
+
+def bench_chunk_code(samples, **_):
+    documents = synthetic_documents(samples)
+    return {"chunk_code": _measure(chunk_code, documents)}
+
+
+def bench_embed(samples, model, batch_size=32, **_):
+    from ingestion.embedder import Embedder
+
+    rng = random.Random(1)
+    batches = [
+        [synthetic_source(rng, n_functions=1, with_class=False) for _ in range(batch_size)]
+        for _ in range(max(1, samples // batch_size))
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if model == "stub":
+            encoder = HashingEncoder()
+            embedder = Embedder(cache_path=str(Path(tmp) / "emb.sqlite"), model=encoder)
+        else:
+            embedder = Embedder(model, cache_path=str(Path(tmp) / "emb.sqlite"))
+
+        uncached = Embedder(embedder.model_name, use_cache=False, model=embedder.model)
+        results = {"embed_uncached": _measure(uncached.embed, batches, batch_size)}
+
+        # First pass fills the cache; the measured passes are all hits
+        for batch in batches:
+            embedder.embed(batch)
+        results["embed_cached_memory"] = _measure(embedder.embed, batches, batch_size)
+
+        def embed_from_disk(batch):
+            embedder.cache.clear_memory()
+            return embedder.embed(batch)
+
+        results["embed_cached_disk"] = _measure(embed_from_disk, batches, batch_size)
+
+    return results
+
+
+def bench_faiss_search(samples, sizes, dim, index_type, k=3, **_):
+    from vectorstore.faiss_index import FAISSIndex
+
+    results = {}
+    rng = np.random.default_rng(0)
+
+    for size in sizes:
+        vectors = synthetic_vectors(size, dim)
+        params = {}
+        if index_type in ("ivf", "ivfpq"):
+            # Enough training points per list at small sizes
+            params["nlist"] = max(1, min(1024, size // 40))
+        index = FAISSIndex(dim, index_type, **params)
+        index.add(vectors, synthetic_chunks(size))
+
+        query_ids = rng.choice(size, size=min(samples, size), replace=False)
+        queries = list(vectors[query_ids] + 0.05 * rng.normal(size=(len(query_ids), dim)).astype("float32"))
+
+        results[f"faiss_search[n={size}]"] = _measure(lambda q: index.search(q, k), queries)
+        results[f"faiss_search_filtered[n={size}]"] = _measure(
+            lambda q: index.search(q, k, language="python"), queries
+        )
+        del index, vectors
+
+    return results
+
+
+def bench_sanitize(samples, **_):
+    rng = random.Random(2)
+    sources = [synthetic_source(rng, with_calls=True) for _ in range(samples)]
+    return {"sanitize": _measure(sanitize_python_code, sources)}
+
+
+def bench_run_tests(samples, **_):
+    from reviewer.executor import CodeExecutor
+
+    tests = get_test_cases("sum_first_n")
+    runs = max(1, samples // 10)
+    results = {}
+
+    for label, use_pool in (("run_tests_pool", True), ("run_tests_inprocess", False)):
+        executor = CodeExecutor(use_process_pool=use_pool)
+        results[label] = _measure(
+            lambda _: executor.run_tests(SUM_FIRST_N, "sum_first_n", tests),
+            list(range(runs)),
+            items_per_call=len(tests),
+        )
+        if executor.pool is not None:
+            executor.pool.close()
+
+    return results
+
+
+def bench_validate(samples, **_):
+    validator = CodeValidator()
+    suites = []
+    for i in range(samples):
+        tests = [{"name": f"t{j}", "input": {"n": j}, "expected": j * 2} for j in range(20)]
+        results = [
+            {"name": f"t{j}", "input": {"n": j}, "output": j * 2 if (i + j) % 7 else -1, "error": None}
+            for j in range(20)
+        ]
+        suites.append((results, tests))
+
+    return {"validate": _measure(
+        lambda suite: validator.validate(execution_results=suite[0], test_cases=suite[1]),
+        suites,
+        items_per_call=20,
+    )}
+
+
+RUNNERS = {
+    "chunk_code": bench_chunk_code,
+    "embed": bench_embed,
+    "faiss_search": bench_faiss_search,
+    "sanitize": bench_sanitize,
+    "run_tests": bench_run_tests,
+    "validate": bench_validate,
+}
+
+
+def run(benchmarks, samples, sizes, dim, index_type, model):
+    report = {}
+    for name in benchmarks:
+        results = RUNNERS[name](
+            samples=samples, sizes=sizes, dim=dim, index_type=index_type, model=model
+        )
+        for label, result in results.items():
+            print(
+                f"{label:<36} {result['throughput_per_s']:>12.1f}/s  "
+                f"p50={result['p50_ms']}ms  p95={result['p95_ms']}ms  "
+                f"p99={result['p99_ms']}ms  peak={result['peak_mb']}MB  "
+                f"(x{result['calls']} calls, p50 spread {result['spread']['p50_ms']:.0%})",
+                flush=True
+            )
+        report.update(results)
+    return report
+
+
+def compare(current, baseline, threshold=None):
+    """
+    Returns regressions: metrics that got worse than the baseline by
+    more than their threshold (a fraction; THRESHOLDS per metric, or
+    threshold for all) and by more than NOISE_MULTIPLIER times the
+    spread measured in either run.
+    """
+    regressions = []
+    for label, result in current.items():
+        base = baseline.get(label)
+        if base is None:
+            continue
+        for metric, metric_threshold in THRESHOLDS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            noise = max(
+                base.get("spread", {}).get(metric, 0.0),
+                result.get("spread", {}).get(metric, 0.0),
+            )
+            limit = max(metric_threshold if threshold is None else threshold,
+                        NOISE_MULTIPLIER * noise)
+
+            change = (new - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > limit:
+                regressions.append({
+                    "benchmark": label,
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change_pct": round(change * 100, 1),
+                    "limit_pct": round(limit * 100, 1),
+                })
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the component micro-benchmarks")
+    parser.add_argument("--only", default=",".join(BENCHMARKS),
+                        help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--sizes", default="1000,100000",
+                        help="Corpus sizes (chunks) searched by faiss_search only, e.g. 1000,100000,1000000")
+    parser.add_argument("--samples", type=int, default=200,
+                        help="Distinct inputs per benchmark (embed: texts, split into batches of 32)")
+    parser.add_argument("--min-calls", type=int, default=MIN_CALLS,
+                        help="Minimum timed calls per pass; inputs are cycled")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME_S,
+                        help="Minimum seconds per timed pass")
+    parser.add_argument("--repeats", type=int, default=REPEATS,
+                        help="Timed passes per benchmark; metrics are medians over them")
+    parser.add_argument("--dim", type=int, default=384, help="Vector dimension")
+    parser.add_argument("--index-type", default="flat", help="FAISSIndex type to search")
+    parser.add_argument("--model", default="stub",
+                        help="'stub' (hashing encoder) or a local sentence-transformers model")
+    parser.add_argument("--output", help="Write the JSON results (e.g. a new baseline) here")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float,
+                        help="Relative change counted as a regression for every metric "
+                             "(default: per-metric THRESHOLDS)")
+    args = parser.parse_args()
+
+    MIN_CALLS, MIN_TIME_S, REPEATS = args.min_calls, args.min_time, args.repeats
+
+    results = run(
+        benchmarks=args.only.split(","),
+        samples=args.samples,
+        sizes=[int(s) for s in args.sizes.split(",")],
+        dim=args.dim,
+        index_type=args.index_type,
+        model=args.model,
+    )
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "samples": args.samples,
+            "min_calls": args.min_calls,
+            "min_time_s": args.min_time,
+            "repeats": args.repeats,
+            "sizes": args.sizes,
+            "dim": args.dim,
+            "index_type": args.index_type,
+            "model": args.model,
+            # Process-wide; includes FAISS / native allocations tracemalloc misses
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline["results"], args.threshold)
+        for r in regressions:
+            print(
+                f"REGRESSION {r['benchmark']} {r['metric']}: "
+                f"{r['baseline']} -> {r['current']} ({r['change_pct']:+.1f}%, "
+                f"limit {r['limit_pct']}%)"
+            )
+        if regressions:
+            sys.exit(1)
+        print("No regressions beyond the noise-aware thresholds.")
@@ -0,0 +1,117 @@
+"""
+Synthetic inputs for the benchmark suite: generated Python sources,
+chunk metadata, clustered vectors and a hashing stand-in for the
+sentence-transformers model, so benchmarks run offline and repeatably.
+"""
+import hashlib
+import random
+
+import numpy as np
+
+CATEGORIES = ["arrays", "strings", "trees", "graphs", "math", "dp"]
+WORDS = [
+    "find", "count", "max", "min", "sum", "merge", "split", "window",
+    "duplicates", "path", "node", "left", "right", "prefix", "suffix", "sort",
+]
+
+
+def _identifier(rng, parts=2):
+    return "_".join(rng.choice(WORDS) for _ in range(parts))
+
+
+def synthetic_function(rng, name=None, body_lines=6):
+    name = name or _identifier(rng)
+    lines = [f"def {name}(nums, k=0):", f'    """{" ".join(rng.sample(WORDS, 5))}"""']
+    lines.append("    result = []")
+    for i in range(body_lines):
+        var = _identifier(rng, 1)
+        lines.append(f"    for {var}_{i} in range(len(nums)):")
+        lines.append(f"        if nums[{var}_{i}] > k + {i}:")
+        lines.append(f"            result.append(nums[{var}_{i}] * {rng.randint(1, 9)})")
+    lines.append("    return result")
+    return "\n".join(lines)
+
+
+def synthetic_source(rng, n_functions=4, with_class=True, with_calls=False):
+    """
+    One Python module: imports, top-level functions, optionally a class
+    with methods and top-level calls (which the sanitizer strips).
+    """
+    parts = ["import math", "from collections import Counter", ""]
+    for _ in range(n_functions):
+        parts.append(synthetic_function(rng))
+        parts.append("")
+
+    if with_class:
+        parts.append(f"class {_identifier(rng, 1).title()}Solver:")
+        parts.append("    limit = 10")
+        for _ in range(2):
+            method = synthetic_function(rng).replace("def ", "def _", 1)
+            parts.extend("    " + line for line in method.replace("(nums", "(self, nums", 1).splitlines())
+            parts.append("")
+
+    if with_calls:
+        parts.append("print(find_max([1, 2, 3]))")
+        parts.append("result = sum_count([4, 5, 6])")
+
+    return "\n".join(parts)
+
+
+def synthetic_documents(n, seed=0):
+    """
+    n corpus documents shaped like ingestion.loader output.
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            "text": synthetic_source(rng, n_functions=rng.randint(2, 6)),
+            "language": "python",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "source": f"corpus/python/{CATEGORIES[i % len(CATEGORIES)]}/doc_{i}.py",
+        }
+        for i in range(n)
+    ]
+
+
+def synthetic_chunks(n):
+    """
+    Lightweight chunk metadata for index benchmarks (text kept short so
+    1M-chunk corpora stay affordable).
+    """
+    languages = ["python", "java", "cpp"]
+    return [
+        {
+            "text": f"def chunk_{i}(): pass",
+            "language": languages[i % len(languages)],
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "source": f"synthetic/{i // 8}.py",
+            "start_line": 1,
+            "end_line": 1,
+            "tokens": 8,
+            "symbol": f"chunk_{i}",
+        }
+        for i in range(n)
+    ]
+
+
+class HashingEncoder:
+    """
+    Deterministic stand-in for SentenceTransformer.encode: token hashing
+    into a fixed-size, L2-normalized vector. Cheap enough that benchmarks
+    of Embedder.embed measure the caching / batching code around it.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        vectors = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for token in text.split():
+                h = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+                vectors[row, h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-6)
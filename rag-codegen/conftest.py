@@ -0,0 +1 @@
+# Lets `pytest` import the project packages (ingestion, vectorstore, ...) from the repo root
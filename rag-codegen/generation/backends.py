@@ -0,0 +1,308 @@
+"""
+Generation backends behind one interface.
+
+    HTTPBackend   any OpenAI-compatible chat completions server (HF router,
+                  vLLM, TGI, ...); sync and async clients are pooled
+    LocalBackend  deterministic in-process stand-in with configurable
+                  latency and token rate, for offline load tests
+
+LLM_BACKEND=http|local selects the backend for llm_client, AsyncLLMClient
+and AITestGenerator.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import httpx
+from dotenv import load_dotenv
+
+# Safe .env loading for Python 3.13
+env_path = Path(__file__).resolve().parents[1] / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DEFAULT_MODEL = "meta-llama/Llama-3.1-8B-Instruct"
+# OpenAI-compatible endpoint; point at a local stub / self-hosted server to test
+DEFAULT_BASE_URL = "https://router.huggingface.co/v1"
+
+LOCAL_MODEL = "local-stub"
+LOCAL_COMPLETION = """<CODE>
+def fibonacci(n):
+    if n <= 0:
+        return []
+    fib = [0, 1]
+    while len(fib) < n:
+        fib.append(fib[-1] + fib[-2])
+    return fib[:n]
+</CODE>
+
+<EXPLANATION>
+Iterative construction in O(n) time and O(n) space.
+</EXPLANATION>
+"""
+
+# Whitespace-attached words, roughly how servers stream tokens
+STREAM_TOKEN_PATTERN = re.compile(r"\s*\S+|\s+")
+
+
+class GenerationBackend(ABC):
+    """
+    A chat-completion model. Params (max_tokens, temperature, ...) are
+    passed per call so one backend can serve different callers.
+    """
+
+    model: str
+
+    @abstractmethod
+    def generate(self, prompt: str, **params) -> str:
+        pass
+
+    @abstractmethod
+    async def agenerate(self, prompt: str, timeout_s: float = None, **params) -> str:
+        pass
+
+    @abstractmethod
+    async def astream(self, prompt: str, timeout_s: float = None, **params):
+        """
+        Async generator of completion text deltas.
+        """
+        pass
+
+    def generate_batch(self, prompts: List[str], **params) -> List[str]:
+        """
+        Submits many prompts at once; results are in prompt order.
+        Default: concurrent single requests, which a batching server
+        (vLLM, TGI) merges into shared forward passes.
+        """
+        if not prompts:
+            return []
+        with ThreadPoolExecutor(max_workers=min(len(prompts), 32)) as pool:
+            return list(pool.map(lambda p: self.generate(p, **params), prompts))
+
+    async def agenerate_batch(self, prompts: List[str], timeout_s: float = None, **params) -> List[str]:
+        return list(await asyncio.gather(
+            *(self.agenerate(p, timeout_s=timeout_s, **params) for p in prompts)
+        ))
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+def _chat_payload(model, prompt, params, stream=False):
+    payload = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        **params,
+    }
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+class HTTPBackend(GenerationBackend):
+    """
+    OpenAI-compatible /chat/completions client.
+
+    One pooled httpx client per mode (sync / async) is shared by all
+    requests; a semaphore caps in-flight async generations.
+    """
+
+    def __init__(
+        self,
+        base_url: str = None,
+        model: str = None,
+        api_key: str = None,
+        timeout_s: float = None,
+        max_concurrency: int = None,
+        max_connections: int = 64,
+    ):
+        self.base_url = (base_url or os.getenv("LLM_BASE_URL", DEFAULT_BASE_URL)).rstrip("/")
+        self.model = model or os.getenv("LLM_MODEL", DEFAULT_MODEL)
+        self.timeout_s = timeout_s or float(os.getenv("LLM_TIMEOUT_S", "60"))
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+
+        api_key = api_key or os.getenv("HF_API_KEY")
+        self._headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+
+        # Created on first use: the sync CLI path never opens an async pool
+        self._client = None
+        self._async_client = None
+        self._semaphore = None
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(
+                base_url=self.base_url,
+                headers=self._headers,
+                timeout=self.timeout_s,
+                limits=self._limits,
+            )
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self._headers,
+                timeout=self.timeout_s,
+                limits=self._limits,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._async_client
+
+    def generate(self, prompt: str, **params) -> str:
+        response = self.client.post(
+            "/chat/completions",
+            json=_chat_payload(self.model, prompt, params),
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+    def generate_batch(self, prompts: List[str], **params) -> List[str]:
+        if not prompts:
+            return []
+        workers = min(len(prompts), self.max_concurrency)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda p: self.generate(p, **params), prompts))
+
+    async def agenerate(self, prompt: str, timeout_s: float = None, **params) -> str:
+        client = self.async_client
+        async with self._semaphore:
+            response = await client.post(
+                "/chat/completions",
+                json=_chat_payload(self.model, prompt, params),
+                timeout=timeout_s or self.timeout_s,
+            )
+
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+    async def astream(self, prompt: str, timeout_s: float = None, **params):
+        client = self.async_client
+        async with self._semaphore:
+            async with client.stream(
+                "POST",
+                "/chat/completions",
+                json=_chat_payload(self.model, prompt, params, stream=True),
+                timeout=timeout_s or self.timeout_s,
+            ) as response:
+                response.raise_for_status()
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+
+                    choices = json.loads(data).get("choices") or [{}]
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
+class LocalBackend(GenerationBackend):
+    """
+    In-process stand-in: returns a fixed completion (or completion_fn(prompt))
+    after ttft_ms plus one token every 1 / tokens_per_s seconds.
+
+    A batch costs one ttft plus the longest completion's decode time,
+    like a continuous-batching server, so batch throughput can be
+    compared with one-at-a-time submission.
+    """
+
+    def __init__(
+        self,
+        model: str = LOCAL_MODEL,
+        ttft_ms: float = None,
+        tokens_per_s: float = None,
+        completion: str = LOCAL_COMPLETION,
+        completion_fn=None,
+    ):
+        self.model = model
+        self.ttft_ms = ttft_ms if ttft_ms is not None else float(os.getenv("LOCAL_LLM_TTFT_MS", "200"))
+        self.tokens_per_s = tokens_per_s or float(os.getenv("LOCAL_LLM_TOKENS_PER_S", "100"))
+        self.completion = completion
+        self.completion_fn = completion_fn
+
+    def _complete(self, prompt):
+        text = self.completion_fn(prompt) if self.completion_fn else self.completion
+        return text, STREAM_TOKEN_PATTERN.findall(text)
+
+    def _latency_s(self, n_tokens):
+        return self.ttft_ms / 1000.0 + n_tokens / self.tokens_per_s
+
+    def generate(self, prompt: str, **params) -> str:
+        text, tokens = self._complete(prompt)
+        time.sleep(self._latency_s(len(tokens)))
+        return text
+
+    def generate_batch(self, prompts: List[str], **params) -> List[str]:
+        completions = [self._complete(p) for p in prompts]
+        if completions:
+            time.sleep(self._latency_s(max(len(tokens) for _, tokens in completions)))
+        return [text for text, _ in completions]
+
+    async def agenerate(self, prompt: str, timeout_s: float = None, **params) -> str:
+        text, tokens = self._complete(prompt)
+        await asyncio.sleep(self._latency_s(len(tokens)))
+        return text
+
+    async def agenerate_batch(self, prompts: List[str], timeout_s: float = None, **params) -> List[str]:
+        completions = [self._complete(p) for p in prompts]
+        if completions:
+            await asyncio.sleep(self._latency_s(max(len(tokens) for _, tokens in completions)))
+        return [text for text, _ in completions]
+
+    async def astream(self, prompt: str, timeout_s: float = None, **params):
+        _, tokens = self._complete(prompt)
+        await asyncio.sleep(self.ttft_ms / 1000.0)
+        for token in tokens:
+            yield token
+            await asyncio.sleep(1.0 / self.tokens_per_s)
+
+
+BACKENDS = {
+    "http": HTTPBackend,
+    "local": LocalBackend,
+}
+
+
+def backend_from_env(model: str = None) -> GenerationBackend:
+    """
+    Builds the backend named by LLM_BACKEND (default "http").
+    model overrides the backend's default model name.
+    """
+    name = os.getenv("LLM_BACKEND", "http").lower()
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown LLM_BACKEND '{name}' (choose from {', '.join(BACKENDS)})"
+        )
+    if model is None:
+        return BACKENDS[name]()
+    return BACKENDS[name](model=model)
@@ -1,26 +1,59 @@
-import os
-from huggingface_hub import InferenceClient
-from dotenv import load_dotenv
-from pathlib import Path
+from generation.backends import GenerationBackend, backend_from_env
+
+GENERATION_PARAMS = {
+    "max_tokens": 600,
+    "temperature": 0.2,
+    "top_p": 0.9,
+}
 
-# Safe .env loading for Python 3.13
-env_path = Path(__file__).resolve().parents[1] / ".env"
-load_dotenv(dotenv_path=env_path)
 
 class llm_client:  # rename later to LLMClient
-    def __init__(self):
-        self.client = InferenceClient(
-            api_key=os.getenv("HF_API_KEY")
-        )
+    """
+    Code-generation model client; the backend comes from LLM_BACKEND
+    unless one is passed in.
+    """
+
+    def __init__(self, backend: GenerationBackend = None):
+        self.backend = backend or backend_from_env()
+        self.model = self.backend.model
 
     def generate(self, prompt: str) -> str:
-        completion = self.client.chat.completions.create(
-            model="meta-llama/Llama-3.1-8B-Instruct",
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=600,
-            temperature=0.2,
-            top_p=0.9
+        return self.backend.generate(prompt, **GENERATION_PARAMS)
+
+    def generate_batch(self, prompts):
+        """
+        Throughput path: submits all prompts together, results in order.
+        """
+        return self.backend.generate_batch(prompts, **GENERATION_PARAMS)
+
+
+class AsyncLLMClient:
+    """
+    Non-blocking code-generation client for the API.
+
+    Pass the sync client's backend to share its configuration (and, for
+    HTTP, its connection settings); pooling and concurrency limits live
+    in the backend.
+    """
+
+    def __init__(self, backend: GenerationBackend = None):
+        self.backend = backend or backend_from_env()
+        self.model = self.backend.model
+
+    async def generate(self, prompt: str, timeout_s: float = None) -> str:
+        return await self.backend.agenerate(prompt, timeout_s=timeout_s, **GENERATION_PARAMS)
+
+    async def generate_batch(self, prompts, timeout_s: float = None):
+        return await self.backend.agenerate_batch(
+            prompts, timeout_s=timeout_s, **GENERATION_PARAMS
         )
-        return completion.choices[0].message.content
+
+    async def stream(self, prompt: str, timeout_s: float = None):
+        """
+        Yields completion text deltas as the backend produces them.
+        """
+        async for delta in self.backend.astream(prompt, timeout_s=timeout_s, **GENERATION_PARAMS):
+            yield delta
+
+    async def aclose(self):
+        await self.backend.aclose()
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from utils.sqlite_db import connect
+
+DEFAULT_RESPONSE_CACHE_PATH = "cache/llm_responses.sqlite"
+
+# Hits record recency in memory; it is written with the next set()
+MAX_PENDING_TOUCHES = 10000
+
+
+def response_cache_key(model: str, params: Dict[str, Any], prompt: str) -> str:
+    """
+    Exact-match key over everything that determines the completion.
+    """
+    payload = json.dumps(
+        {"model": model, "params": params, "prompt": prompt},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCacheBackend(ABC):
+    """
+    Storage for cached completions. Entries older than ttl_s are misses.
+    """
+
+    @abstractmethod
+    def get(self, key: str, ttl_s: float) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        pass
+
+
+class MemoryCacheBackend(ResponseCacheBackend):
+    """
+    In-process LRU, bounded by entry count.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, ttl_s):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            created_at, value = entry
+            if time.time() - created_at > ttl_s:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class DiskCacheBackend(ResponseCacheBackend):
+    """
+    SQLite-backed cache shared by all workers on a host.
+
+    Bounded by entry count; the least recently used rows are evicted.
+    Reads never write: hits queue their last_used update, and set()
+    writes the queued updates, the new row and any eviction in one
+    commit. Eviction only runs once the row count exceeds max_entries.
+    """
+
+    def __init__(self, path: str = DEFAULT_RESPONSE_CACHE_PATH, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._touched = {}  # key -> last_used not yet written
+
+        self._db = connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)"
+        )
+        self._db.commit()
+        self._count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key, ttl_s):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created_at = row
+            if now - created_at > ttl_s:
+                # Left for set() to overwrite or eviction to drop
+                return None
+
+            if key in self._touched or len(self._touched) < MAX_PENDING_TOUCHES:
+                self._touched[key] = now
+            return value
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            exists = self._db.execute(
+                "SELECT 1 FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if not exists:
+                self._count += 1
+            self._touched.pop(key, None)
+
+            if self._touched:
+                self._db.executemany(
+                    "UPDATE responses SET last_used = ? WHERE key = ?",
+                    [(last_used, k) for k, last_used in self._touched.items()],
+                )
+                self._touched.clear()
+
+            overflow = self._count - self.max_entries
+            if overflow > 0:
+                cursor = self._db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                    (overflow,),
+                )
+                self._count -= cursor.rowcount
+            self._db.commit()
+
+
+class ResponseCache:
+    """
+    Exact-match LLM response cache keyed by model, sampling
+    parameters and the fully rendered prompt.
+    """
+
+    def __init__(self, backend: ResponseCacheBackend, ttl_s: float = 24 * 3600):
+        self.backend = backend
+        self.ttl_s = ttl_s
+        self.stats = {"hits": 0, "misses": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        """
+        LLM_CACHE_BACKEND: memory (default) | disk | none
+        LLM_CACHE_TTL_S, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_PATH
+        """
+        kind = os.getenv("LLM_CACHE_BACKEND", "memory").lower()
+        ttl_s = float(os.getenv("LLM_CACHE_TTL_S", str(24 * 3600)))
+        max_entries = os.getenv("LLM_CACHE_MAX_ENTRIES")
+
+        if kind == "none":
+            return None
+        if kind == "disk":
+            backend = DiskCacheBackend(
+                path=os.getenv("LLM_CACHE_PATH", DEFAULT_RESPONSE_CACHE_PATH),
+                max_entries=int(max_entries or 100000),
+            )
+        elif kind == "memory":
+            backend = MemoryCacheBackend(max_entries=int(max_entries or 1000))
+        else:
+            raise ValueError(f"Unknown LLM_CACHE_BACKEND '{kind}'")
+
+        return cls(backend, ttl_s=ttl_s)
+
+    def get(self, model: str, params: Dict[str, Any], prompt: str) -> Optional[str]:
+        value = self.backend.get(response_cache_key(model, params, prompt), self.ttl_s)
+        if value is None:
+            self.stats["misses"] += 1
+        else:
+            self.stats["hits"] += 1
+        return value
+
+    def set(self, model: str, params: Dict[str, Any], prompt: str, value: str) -> None:
+        self.backend.set(response_cache_key(model, params, prompt), value)
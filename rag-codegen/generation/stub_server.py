@@ -0,0 +1,66 @@
+"""
+Local stand-in for an OpenAI-compatible inference server.
+
+Returns a canned completion after a configurable delay (streamed token
+by token when "stream": true), so the async request path can be
+load-tested without network access:
+
+    STUB_LATENCY_MS=800 uvicorn generation.stub_server:app --port 8001
+    LLM_BASE_URL=http://127.0.0.1:8001/v1 uvicorn api.app:app
+"""
+import asyncio
+import json
+import os
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from generation.backends import LOCAL_COMPLETION as STUB_COMPLETION, STREAM_TOKEN_PATTERN
+
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "500"))
+# Delay before the first streamed token, then per token
+STUB_TTFT_MS = float(os.getenv("STUB_TTFT_MS", "200"))
+STUB_TOKEN_MS = float(os.getenv("STUB_TOKEN_MS", "10"))
+
+app = FastAPI(title="Stub Inference Server")
+
+
+async def _stream_completion(model: str):
+    await asyncio.sleep(STUB_TTFT_MS / 1000.0)
+
+    for token in STREAM_TOKEN_PATTERN.findall(STUB_COMPLETION):
+        chunk = {
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": token}}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(STUB_TOKEN_MS / 1000.0)
+
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(payload: dict):
+    if payload.get("stream"):
+        return StreamingResponse(
+            _stream_completion(payload.get("model", "stub")),
+            media_type="text/event-stream",
+        )
+
+    await asyncio.sleep(STUB_LATENCY_MS / 1000.0)
+
+    return {
+        "id": "stub-completion",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", "stub"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": STUB_COMPLETION},
+                "finish_reason": "stop",
+            }
+        ],
+    }
@@ -0,0 +1,100 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batches single-text embedding requests from concurrent callers.
+
+    Requests arriving within max_wait_ms of the first queued one (up to
+    max_batch_size) are encoded with a single Embedder.embed call, and
+    each caller receives its own row of the result.
+    """
+
+    def __init__(self, embedder, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.embedder = embedder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self.stats = {"batches": 0, "items": 0, "cancelled": 0}
+
+        self._worker = threading.Thread(
+            target=self._run, name="embedding-batcher", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        if self._closed:
+            raise RuntimeError("EmbeddingBatcher is closed")
+
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed_one(self, text: str, timeout=None):
+        """
+        Blocking helper: returns the embedding vector for one text.
+        """
+        return self.submit(text).result(timeout=timeout)
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect_batch(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Re-queue the shutdown marker for the main loop
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            try:
+                self._process(self._collect_batch(first))
+            except Exception as e:
+                # One bad batch must not stop the worker every request waits on
+                print(f"[EMBEDDING BATCHER ERROR] {e}")
+
+    def _process(self, batch):
+        # Callers cancel futures on disconnect / timeout; once marked
+        # running, the rest can no longer be cancelled under us
+        live = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        self.stats["cancelled"] += len(batch) - len(live)
+        if not live:
+            return
+
+        try:
+            vectors = self.embedder.embed([text for text, _ in live])
+        except Exception as e:
+            for _, future in live:
+                future.set_exception(e)
+            return
+
+        self.stats["batches"] += 1
+        self.stats["items"] += len(live)
+
+        for (_, future), vector in zip(live, vectors):
+            future.set_result(vector)
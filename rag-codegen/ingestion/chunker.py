@@ -1,24 +1,184 @@
-def chunk_code(document, max_lines=40):
-    lines = document["text"].splitlines()
+import ast
+import re
+
+# Roughly one token per identifier/number/punctuation mark; close enough to
+# sub-word tokenizers on code to budget chunks and prompt context.
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# all-MiniLM-L6-v2 truncates input beyond 256 word pieces
+DEFAULT_MAX_TOKENS = 256
+DEFAULT_OVERLAP_LINES = 3
+
+
+def count_tokens(text: str) -> int:
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def _make_chunk(document, lines, start, end, symbol=None):
+    """
+    Builds a chunk from 1-based inclusive line range [start, end].
+    """
+    text = "\n".join(lines[start - 1:end])
+    return {
+        "text": text,
+        "language": document["language"],
+        "category": document["category"],
+        "source": document.get("source"),
+        "start_line": start,
+        "end_line": end,
+        "tokens": count_tokens(text),
+        "symbol": symbol,
+    }
+
+
+def _trim(lines, start, end):
+    # Drop blank lines at either edge of a range
+    while start < end and not lines[start - 1].strip():
+        start += 1
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    return start, end
+
+
+def _split_windows(document, lines, start, end, max_tokens, overlap_lines, symbol=None):
+    """
+    Splits a line range into windows of at most max_tokens, with
+    overlap_lines of context repeated between consecutive windows.
+    """
     chunks = []
+    line_tokens = [count_tokens(line) for line in lines[start - 1:end]]
+
+    window_start = start
+    while window_start <= end:
+        used = 0
+        window_end = window_start
+        while window_end <= end:
+            cost = line_tokens[window_end - start]
+            if used + cost > max_tokens and window_end > window_start:
+                break
+            used += cost
+            window_end += 1
+        window_end -= 1
 
-    current_chunk = []
-
-    for line in lines:
-        current_chunk.append(line)
-        if len(current_chunk) >= max_lines:
-            chunks.append({
-                "text": "\n".join(current_chunk),
-                "language": document["language"],
-                "category": document["category"]
-            })
-            current_chunk = []
-
-    if current_chunk:
-        chunks.append({
-            "text": "\n".join(current_chunk),
-            "language": document["language"],
-            "category": document["category"]
-        })
+        chunks.append(_make_chunk(document, lines, window_start, window_end, symbol))
+        if window_end >= end:
+            break
+        # Always advance, even if the overlap covers the whole window
+        window_start = max(window_start + 1, window_end - overlap_lines + 1)
 
     return chunks
+
+
+def _node_start(node):
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [d.lineno for d in decorators])
+
+
+def _definition_units(body, first_line, last_line):
+    """
+    Yields (start, end, node) ranges covering body. Each def/class is its
+    own unit (with the comments right above it); runs of other top-level
+    statements are grouped into units with node=None.
+    """
+    units = []
+    cursor = first_line
+    pending_start = None
+
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            if pending_start is not None:
+                units.append((pending_start, cursor - 1, None))
+                pending_start = None
+            # Comments between the previous unit and this def belong to it
+            units.append((cursor, node.end_lineno, node))
+            cursor = node.end_lineno + 1
+        else:
+            if pending_start is None:
+                pending_start = cursor
+            cursor = node.end_lineno + 1
+
+    if pending_start is not None:
+        units.append((pending_start, last_line, None))
+    elif units and cursor <= last_line:
+        # Trailing comments stick to the last unit
+        start, _, node = units[-1]
+        units[-1] = (start, last_line, node)
+
+    return units
+
+
+def _chunk_python(document, lines, tree, max_tokens, overlap_lines):
+    chunks = []
+
+    for start, end, node in _definition_units(tree.body, 1, len(lines)):
+        start, end = _trim(lines, start, end)
+        if start > end or not any(l.strip() for l in lines[start - 1:end]):
+            continue
+
+        symbol = getattr(node, "name", None)
+        text_tokens = count_tokens("\n".join(lines[start - 1:end]))
+
+        if text_tokens <= max_tokens:
+            chunks.append(_make_chunk(document, lines, start, end, symbol))
+            continue
+
+        if isinstance(node, ast.ClassDef) and node.body:
+            # Oversized class: header (with class-level statements) + one unit per method
+            body_start = _node_start(node.body[0])
+            units = _definition_units(node.body, body_start, end)
+
+            if units[0][2] is None:
+                units[0] = (start, units[0][1], None)
+            else:
+                units.insert(0, (start, body_start - 1, None))
+
+            for sub_start, sub_end, sub_node in units:
+                sub_start, sub_end = _trim(lines, sub_start, sub_end)
+                sub_symbol = symbol
+                if sub_node is not None:
+                    sub_symbol = f"{symbol}.{sub_node.name}"
+                sub_text = "\n".join(lines[sub_start - 1:sub_end])
+                if count_tokens(sub_text) <= max_tokens:
+                    chunks.append(_make_chunk(document, lines, sub_start, sub_end, sub_symbol))
+                else:
+                    chunks.extend(_split_windows(
+                        document, lines, sub_start, sub_end,
+                        max_tokens, overlap_lines, sub_symbol
+                    ))
+            continue
+
+        chunks.extend(_split_windows(
+            document, lines, start, end, max_tokens, overlap_lines, symbol
+        ))
+
+    return chunks
+
+
+def chunk_code(document, max_tokens=DEFAULT_MAX_TOKENS, overlap_lines=DEFAULT_OVERLAP_LINES):
+    """
+    Splits a source document into retrieval chunks.
+
+    Python files are split at function / class boundaries using ast, so
+    each chunk is a self-contained unit; definitions over max_tokens are
+    split further (classes per method, then token windows with
+    overlap_lines of overlap). Other languages, and Python that does
+    not parse, fall back to token windows.
+
+    Each chunk carries its source path, 1-based line range, token count
+    and (for definitions) the symbol name.
+    """
+    lines = document["text"].splitlines()
+    if not any(line.strip() for line in lines):
+        return []
+
+    if document.get("language", "").lower() == "python":
+        try:
+            tree = ast.parse(document["text"])
+        except SyntaxError:
+            tree = None
+
+        if tree is not None:
+            return _chunk_python(document, lines, tree, max_tokens, overlap_lines)
+
+    start, end = _trim(lines, 1, len(lines))
+    return _split_windows(document, lines, start, end, max_tokens, overlap_lines)
@@ -1,10 +1,86 @@
-from sentence_transformers import SentenceTransformer
+import os
+
+import numpy as np
+
+from ingestion.embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# EMBEDDER_BACKEND=torch (sentence-transformers) | onnx (ingestion.onnx_encoder)
+EMBEDDER_BACKENDS = ("torch", "onnx")
+
+
+def _onnx_quantized():
+    return os.getenv("EMBEDDER_ONNX_QUANTIZED", "1") != "0"
+
+
+def embedding_model_id(model_name=DEFAULT_MODEL_NAME, backend=None):
+    """
+    Cache namespace for a model + backend. ONNX / int8 vectors drift
+    slightly from the PyTorch ones, so they are cached separately.
+    """
+    backend = backend or os.getenv("EMBEDDER_BACKEND", "torch")
+    if backend == "torch":
+        return model_name
+    return f"{model_name}#onnx-{'int8' if _onnx_quantized() else 'fp32'}"
+
+
+def _load_model(model_name, backend, threads):
+    if backend not in EMBEDDER_BACKENDS:
+        raise ValueError(
+            f"Unknown EMBEDDER_BACKEND '{backend}' (choose from {', '.join(EMBEDDER_BACKENDS)})"
+        )
+
+    if backend == "onnx":
+        from ingestion.onnx_encoder import OnnxEncoder, DEFAULT_ONNX_DIR
+        return OnnxEncoder(
+            os.getenv("EMBEDDER_ONNX_DIR", DEFAULT_ONNX_DIR),
+            quantized=_onnx_quantized(),
+            threads=threads,
+        )
+
+    # Imported here so the ONNX backend runs without torch installed
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
 
 class Embedder:
-    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(
+        self,
+        model_name=DEFAULT_MODEL_NAME,
+        use_cache=True,
+        cache_path=DEFAULT_CACHE_PATH,
+        model=None,
+        backend=None,
+        threads=None,
+    ):
+        self.model_name = model_name
+        self.backend = backend or os.getenv("EMBEDDER_BACKEND", "torch")
+        # Any object with SentenceTransformer's encode() (e.g. a stub for benchmarks)
+        self.model = model if model is not None else _load_model(model_name, self.backend, threads)
+        self.cache = (
+            EmbeddingCache(embedding_model_id(model_name, self.backend), path=cache_path)
+            if use_cache else None
+        )
 
     def embed(self, texts):
         if isinstance(texts, str):
             texts = [texts]
-        return self.model.encode(texts, convert_to_numpy=True)
+
+        if self.cache is None or not texts:
+            return self.model.encode(texts, convert_to_numpy=True)
+
+        vectors = self.cache.get_many(texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+
+        if missing:
+            # Encode each distinct uncached text once
+            unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+            encoded = self.model.encode(unique_texts, convert_to_numpy=True)
+            self.cache.put_many(unique_texts, encoded)
+
+            by_text = dict(zip(unique_texts, encoded))
+            for i in missing:
+                vectors[i] = by_text[texts[i]]
+
+        return np.vstack(vectors).astype("float32")
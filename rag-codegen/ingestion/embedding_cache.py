@@ -0,0 +1,165 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.sqlite_db import connect
+
+DEFAULT_CACHE_PATH = "cache/embeddings.sqlite"
+
+# Disk hits record recency in memory; it is written with the next put_many()
+MAX_PENDING_TOUCHES = 100000
+
+
+def embedding_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: an in-process LRU in front of a
+    persistent SQLite store, keyed by model name + text hash.
+
+    Both tiers are size-bounded; the disk tier evicts the least
+    recently used rows once it grows past max_disk_entries. Lookups
+    never write to disk: their last_used updates are queued and
+    committed together with the next put_many().
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        path: str = DEFAULT_CACHE_PATH,
+        max_memory_entries: int = 10000,
+        max_disk_entries: int = 1000000,
+    ):
+        self.model_name = model_name
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._memory = OrderedDict()
+        self._touched = {}  # key -> last_used not yet written
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._db = None
+        if path:
+            # Shared with the sharded build workers: WAL + busy timeout
+            self._db = connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)"
+            )
+            self._db.commit()
+            self._disk_count = self._db.execute(
+                "SELECT COUNT(*) FROM embeddings"
+            ).fetchone()[0]
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts):
+        """
+        Returns a list aligned with texts: cached vector or None.
+        """
+        keys = [embedding_key(self.model_name, t) for t in texts]
+        results = [None] * len(texts)
+        disk_lookup = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self.stats["memory_hits"] += 1
+                else:
+                    disk_lookup.setdefault(key, []).append(i)
+
+            if disk_lookup and self._db is not None:
+                found = self._read_disk(list(disk_lookup))
+                for key, vector in found.items():
+                    self._remember(key, vector)
+                    for i in disk_lookup.pop(key):
+                        results[i] = vector
+                        self.stats["disk_hits"] += 1
+
+            self.stats["misses"] += sum(len(v) for v in disk_lookup.values())
+
+        return results
+
+    def put_many(self, texts, vectors):
+        now = time.time()
+        rows = []
+
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = embedding_key(self.model_name, text)
+                vector = np.asarray(vector, dtype="float32")
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes(), now))
+
+            if self._db is not None and rows:
+                # Same key always means the same vector, so existing rows are kept
+                cursor = self._db.executemany(
+                    "INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?)", rows
+                )
+                self._disk_count += cursor.rowcount
+                self._write_touches()
+                self._evict_disk()
+                self._db.commit()
+
+    def _read_disk(self, keys):
+        found = {}
+        # SQLite caps bound parameters per statement
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                batch,
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype="float32")
+
+        now = time.time()
+        for key in found:
+            if key in self._touched or len(self._touched) < MAX_PENDING_TOUCHES:
+                self._touched[key] = now
+
+        return found
+
+    def _write_touches(self):
+        if self._touched:
+            self._db.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict_disk(self):
+        overflow = self._disk_count - self.max_disk_entries
+        if overflow > 0:
+            cursor = self._db.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
+            self._disk_count -= cursor.rowcount
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
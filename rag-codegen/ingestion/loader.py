@@ -1,20 +1,35 @@
+import hashlib
+import os
 from pathlib import Path
 
-def load_code_files(base_path="corpus"):
-    documents = []
 
-    for path in Path(base_path).rglob("*.py"):
-        language = path.parts[1]      # python
-        category = path.parts[2]      # arrays, strings, etc.
+def iter_code_files(base_path="corpus"):
+    """
+    Walks the corpus lazily, yielding .py paths in a stable order.
+    """
+    for root, dirs, files in os.walk(base_path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(".py"):
+                yield Path(root) / name
+
+
+def read_code_file(path, base_path="corpus"):
+    relative = Path(path).relative_to(base_path)
+    language = relative.parts[0]      # python
+    category = relative.parts[1]      # arrays, strings, etc.
 
-        with open(path, "r", encoding="utf-8") as f:
-            code = f.read()
+    with open(path, "r", encoding="utf-8") as f:
+        code = f.read()
 
-        documents.append({
-            "text": code,
-            "language": language,
-            "category": category,
-            "source": str(path)
-        })
+    return {
+        "text": code,
+        "language": language,
+        "category": category,
+        "source": str(path),
+        "hash": hashlib.sha256(code.encode("utf-8")).hexdigest()
+    }
 
-    return documents
+
+def load_code_files(base_path="corpus"):
+    return [read_code_file(path, base_path) for path in iter_code_files(base_path)]
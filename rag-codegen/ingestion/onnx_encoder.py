@@ -0,0 +1,157 @@
+"""
+ONNX Runtime backend for the Embedder.
+
+Exports the sentence-transformers model's transformer to ONNX, applies
+dynamic int8 quantization to its weights, and runs it on CPU with the
+same mean pooling + L2 normalization as all-MiniLM-L6-v2. Serving needs
+only onnxruntime and tokenizers (no torch):
+
+    python -m ingestion.onnx_encoder --model sentence-transformers/all-MiniLM-L6-v2
+    EMBEDDER_BACKEND=onnx python -m vectorstore.build_index
+
+Export additionally needs torch, transformers and onnx.
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_ONNX_DIR = "models/minilm-onnx"
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+# all-MiniLM-L6-v2 truncates input beyond 256 word pieces
+MAX_SEQ_LENGTH = 256
+
+
+def export_onnx(model_name, output_dir=DEFAULT_ONNX_DIR, quantize=True, opset=14):
+    """
+    Writes model.onnx (+ model.int8.onnx) and tokenizer.json to output_dir.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(output_dir)  # includes tokenizer.json (fast tokenizer)
+
+    model = AutoModel.from_pretrained(model_name).eval()
+    dummy = tokenizer(["def hello(): return 'world'"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in input_names),
+            str(output_dir / MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: dynamic for name in input_names + ["last_hidden_state"]},
+            opset_version=opset,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        # Weights to int8, activations quantized on the fly per batch
+        quantize_dynamic(
+            str(output_dir / MODEL_FILE),
+            str(output_dir / QUANTIZED_MODEL_FILE),
+            weight_type=QuantType.QInt8,
+        )
+
+
+class OnnxEncoder:
+    """
+    Drop-in for SentenceTransformer.encode() backed by ONNX Runtime.
+    """
+
+    def __init__(
+        self,
+        model_dir=DEFAULT_ONNX_DIR,
+        quantized=True,
+        threads=None,
+        max_seq_length=MAX_SEQ_LENGTH,
+    ):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The ONNX embedder backend needs `pip install onnxruntime tokenizers`"
+            ) from e
+
+        model_dir = Path(model_dir)
+        model_path = model_dir / (QUANTIZED_MODEL_FILE if quantized else MODEL_FILE)
+        if not model_path.exists():
+            raise FileNotFoundError(
+                f"No ONNX model at '{model_path}'. Run `python -m ingestion.onnx_encoder` first."
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.quantized = quantized
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_seq_length)
+        pad_id = self.tokenizer.token_to_id("[PAD]") or 0
+        self.tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+
+    def get_sentence_embedding_dimension(self):
+        return self.session.get_outputs()[0].shape[-1]
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype="int64"),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype="int64"),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype="int64"),
+        }
+        hidden = self.session.run(
+            None, {name: value for name, value in feeds.items() if name in self.input_names}
+        )[0]
+
+        # Mean pooling over real tokens, then L2 normalization
+        mask = feeds["attention_mask"][:, :, None].astype("float32")
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.maximum(norms, 1e-12)
+
+    def encode(self, texts, convert_to_numpy=True, batch_size=32, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype="float32")
+
+        # Length-sorted batches pad less; results are restored to input order
+        order = np.argsort([len(t) for t in texts])
+        vectors = np.empty((len(texts), self.get_sentence_embedding_dimension()), dtype="float32")
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            vectors[idx] = self._encode_batch([texts[i] for i in idx])
+        return vectors
+
+
+if __name__ == "__main__":
+    from ingestion.embedder import DEFAULT_MODEL_NAME
+
+    parser = argparse.ArgumentParser(description="Export the embedding model to (int8) ONNX")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--out", default=DEFAULT_ONNX_DIR)
+    parser.add_argument("--no-quantize", action="store_true", help="Only export fp32")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+
+    export_onnx(args.model, args.out, quantize=not args.no_quantize, opset=args.opset)
+    print(f"Exported {args.model} to {args.out}")
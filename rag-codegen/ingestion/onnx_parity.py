@@ -0,0 +1,165 @@
+"""
+Parity check and benchmark: ONNX Runtime (int8) embedder vs PyTorch.
+
+Embeds the same chunks with both backends, each in its own process so
+memory numbers are not mixed, and reports:
+
+  - cosine drift between the two vectors of each chunk (mean / p1 / min)
+  - retrieval overlap@k: top-k neighbours of sampled queries, ONNX query
+    against the PyTorch index and fully ONNX, vs the PyTorch top-k
+  - sentences/sec, model load time and peak RSS per backend
+
+    python -m ingestion.onnx_parity --corpus corpus --k 5
+    python -m ingestion.onnx_parity --synthetic 2000 --output onnx_parity.json
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import resource
+import time
+
+import numpy as np
+
+from ingestion.chunker import chunk_code
+from ingestion.embedder import DEFAULT_MODEL_NAME
+
+
+def _corpus_texts(corpus_dir, synthetic, limit):
+    if synthetic:
+        from benchmarks.synthetic import synthetic_documents
+        documents = synthetic_documents(synthetic)
+    else:
+        from ingestion.loader import load_code_files
+        documents = load_code_files(corpus_dir)
+
+    texts = [chunk["text"] for doc in documents for chunk in chunk_code(doc)]
+    return texts[:limit] if limit else texts
+
+
+def _run_backend(backend, model_name, onnx_dir, quantized, threads, texts, batch_size):
+    """
+    Runs in a child process: loads one backend, embeds texts, reports
+    vectors plus timing and peak RSS.
+    """
+    os.environ["EMBEDDER_ONNX_DIR"] = onnx_dir
+    os.environ["EMBEDDER_ONNX_QUANTIZED"] = "1" if quantized else "0"
+    if threads:
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+            os.environ[var] = str(threads)
+
+    from ingestion.embedder import Embedder
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    embedder = Embedder(model_name, use_cache=False, backend=backend, threads=threads)
+    load_s = time.perf_counter() - start
+
+    embedder.model.encode(texts[:batch_size], convert_to_numpy=True)  # warmup
+
+    start = time.perf_counter()
+    vectors = np.asarray(
+        embedder.model.encode(texts, convert_to_numpy=True, batch_size=batch_size),
+        dtype="float32",
+    )
+    elapsed = time.perf_counter() - start
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return vectors, {
+        "load_s": round(load_s, 3),
+        "sentences_per_s": round(len(texts) / elapsed, 1),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "rss_added_mb": round((peak_kb - rss_before) / 1024, 1),
+    }
+
+
+def _normalize(vectors):
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def _top_k(queries, corpus, k):
+    scores = queries @ corpus.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def _overlap(found, expected):
+    k = expected.shape[1]
+    return float(np.mean([len(set(f) & set(e)) / k for f, e in zip(found, expected)]))
+
+
+def compare_backends(reference, candidate, n_queries=200, k=5, seed=0):
+    """
+    Drift and retrieval agreement of candidate vectors vs reference
+    vectors for the same texts. Queries are a sample of the corpus
+    vectors themselves, with each query's own row excluded.
+    """
+    reference, candidate = _normalize(reference), _normalize(candidate)
+    cosine = np.sum(reference * candidate, axis=1)
+
+    rng = np.random.default_rng(seed)
+    query_ids = rng.choice(len(reference), size=min(n_queries, len(reference)), replace=False)
+
+    def neighbours(queries, corpus):
+        found = _top_k(queries, corpus, k + 1)
+        return np.array([[i for i in row if i != q][:k] for row, q in zip(found, query_ids)])
+
+    expected = neighbours(reference[query_ids], reference)
+    return {
+        "texts": len(reference),
+        "queries": len(query_ids),
+        "cosine_mean": round(float(cosine.mean()), 5),
+        "cosine_p1": round(float(np.percentile(cosine, 1)), 5),
+        "cosine_min": round(float(cosine.min()), 5),
+        f"overlap@{k}_query_only": round(_overlap(neighbours(candidate[query_ids], reference), expected), 4),
+        f"overlap@{k}_full": round(_overlap(neighbours(candidate[query_ids], candidate), expected), 4),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the ONNX embedder with the PyTorch one")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--onnx-dir", default=os.getenv("EMBEDDER_ONNX_DIR", "models/minilm-onnx"))
+    parser.add_argument("--fp32", action="store_true", help="Compare the unquantized ONNX model")
+    parser.add_argument("--corpus", default="corpus", help="Corpus root directory")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Use N synthetic documents instead of the corpus")
+    parser.add_argument("--limit", type=int, default=5000, help="Max chunks to embed")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, help="Intra-op threads per backend")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    texts = _corpus_texts(args.corpus, args.synthetic, args.limit)
+    if not texts:
+        raise SystemExit("No chunks to embed.")
+    random.Random(0).shuffle(texts)
+    print(f"{len(texts)} chunks")
+
+    report = {"model": args.model, "onnx": "fp32" if args.fp32 else "int8", "backends": {}}
+    vectors = {}
+    ctx = mp.get_context("spawn")
+    for backend in ("torch", "onnx"):
+        with ctx.Pool(1) as pool:
+            vectors[backend], stats = pool.apply(
+                _run_backend,
+                (backend, args.model, args.onnx_dir, not args.fp32,
+                 args.threads, texts, args.batch_size),
+            )
+        report["backends"][backend] = stats
+        print(f"{backend:<6} {stats['sentences_per_s']:>8.1f} sentences/s  "
+              f"load={stats['load_s']}s  peak_rss={stats['peak_rss_mb']}MB")
+
+    report["parity"] = compare_backends(vectors["torch"], vectors["onnx"], args.queries, args.k)
+    torch_rate = report["backends"]["torch"]["sentences_per_s"]
+    report["speedup"] = round(report["backends"]["onnx"]["sentences_per_s"] / torch_rate, 2)
+
+    for key, value in report["parity"].items():
+        print(f"{key:<24} {value}")
+    print(f"{'speedup':<24} {report['speedup']}x")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
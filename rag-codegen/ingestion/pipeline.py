@@ -0,0 +1,86 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ingestion.chunker import chunk_code
+from ingestion.loader import iter_code_files, read_code_file
+
+
+def iter_documents(base_path="corpus", read_workers=4, read_ahead=64):
+    """
+    Reads corpus files in parallel, yielding documents in walk order.
+
+    At most `read_ahead` files are read ahead of the consumer, so memory
+    stays bounded no matter how large the corpus is.
+    """
+    in_flight = deque()
+
+    with ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="corpus-reader") as pool:
+        for path in iter_code_files(base_path):
+            in_flight.append(pool.submit(read_code_file, path, base_path))
+            if len(in_flight) >= read_ahead:
+                yield in_flight.popleft().result()
+
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def iter_chunk_batches(documents, batch_size=256, **chunk_options):
+    """
+    Chunks a document stream and regroups the chunks into fixed-size
+    batches for embedding. A file's chunks may span two batches.
+    """
+    batch = []
+    for doc in documents:
+        for chunk in chunk_code(doc, **chunk_options):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if batch:
+        yield batch
+
+
+_END = object()
+
+
+def prefetch(iterable, max_queued=2):
+    """
+    Runs an iterator in a background thread behind a bounded queue, so
+    the producer (read + chunk) overlaps with the consumer (embed + add)
+    without running more than max_queued items ahead.
+    """
+    items = queue.Queue(maxsize=max_queued)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    return
+                items.put(item)
+            items.put(_END)
+        except BaseException as e:
+            items.put(e)
+
+    thread = threading.Thread(target=produce, name="ingest-prefetch", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = items.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Unblock the producer if it is waiting on a full queue
+        while thread.is_alive():
+            try:
+                items.get_nowait()
+            except queue.Empty:
+                thread.join(timeout=0.1)
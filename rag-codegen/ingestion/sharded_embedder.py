@@ -0,0 +1,134 @@
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from ingestion.embedder import DEFAULT_MODEL_NAME, embedding_model_id
+from ingestion.embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+
+# Set per worker process in _init_worker
+_worker_embedder = None
+
+
+def _init_worker(model_name, threads):
+    """
+    Loads one model copy per worker with a fixed intra-op thread count,
+    so N workers don't each try to use every core.
+    """
+    global _worker_embedder
+
+    # Must be set before torch is imported to size its thread pools
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    from ingestion.embedder import Embedder
+    # The parent owns the embedding cache (single SQLite writer).
+    # EMBEDDER_BACKEND is inherited from the parent's environment.
+    _worker_embedder = Embedder(model_name, use_cache=False, threads=threads)
+
+
+def _embed_shard(seq, texts, shard_dir):
+    vectors = np.asarray(_worker_embedder.embed(texts), dtype="float32")
+    path = Path(shard_dir) / f"shard-{seq:06d}.npy"
+    np.save(path, vectors)
+    return str(path)
+
+
+class ShardedEmbedder:
+    """
+    Embeds chunk batches across N worker processes, each with its own
+    model copy.
+
+    Workers write each batch's vectors to a .npy shard; shards are read
+    back and yielded in submission order, so the merged index gets the
+    same ids no matter which worker finishes first. Cache lookups and
+    writes stay in the parent; only uncached texts are sent to workers.
+    """
+
+    def __init__(
+        self,
+        workers,
+        threads_per_worker=None,
+        model_name=DEFAULT_MODEL_NAME,
+        use_cache=True,
+        cache_path=DEFAULT_CACHE_PATH,
+        max_in_flight=None,
+    ):
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.model_name = model_name
+        self.cache = (
+            EmbeddingCache(embedding_model_id(model_name), path=cache_path)
+            if use_cache else None
+        )
+        self.max_in_flight = max_in_flight or workers * 2
+
+        self._shard_dir = tempfile.mkdtemp(prefix="embedding-shards-")
+
+        # Same choice as the sandbox pool: don't fork a threaded parent
+        method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context(method),
+            initializer=_init_worker,
+            initargs=(model_name, self.threads_per_worker),
+        )
+        self._seq = 0
+
+    def _submit(self, chunks):
+        texts = [c["text"] for c in chunks]
+        vectors = self.cache.get_many(texts) if self.cache else [None] * len(texts)
+        unique_texts = list(dict.fromkeys(
+            t for t, v in zip(texts, vectors) if v is None
+        ))
+
+        future = None
+        if unique_texts:
+            future = self._pool.submit(_embed_shard, self._seq, unique_texts, self._shard_dir)
+            self._seq += 1
+
+        return chunks, texts, vectors, unique_texts, future
+
+    def _collect(self, chunks, texts, vectors, unique_texts, future):
+        if future is not None:
+            path = future.result()
+            encoded = np.load(path)
+            os.remove(path)
+
+            if self.cache:
+                self.cache.put_many(unique_texts, encoded)
+
+            by_text = dict(zip(unique_texts, encoded))
+            vectors = [v if v is not None else by_text[t] for t, v in zip(texts, vectors)]
+
+        return chunks, np.vstack(vectors).astype("float32")
+
+    def embed_batches(self, batches):
+        """
+        Yields (chunks, vectors) for each batch, in input order, with at
+        most max_in_flight batches queued on the workers.
+        """
+        in_flight = deque()
+
+        for chunks in batches:
+            in_flight.append(self._submit(chunks))
+            if len(in_flight) >= self.max_in_flight:
+                yield self._collect(*in_flight.popleft())
+
+        while in_flight:
+            yield self._collect(*in_flight.popleft())
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
+        shutil.rmtree(self._shard_dir, ignore_errors=True)
@@ -1,5 +1,5 @@
 from pipeline.rag_pipeline import RAGPipeline
-from utils.logger import log_run
+from utils.logger import log_run, get_run_logger
 from utils.metrics import compute_metrics
 
 def main():
@@ -45,8 +45,8 @@ def main():
         "metrics": metrics
     }
 
-    log_path = log_run(log_data)
-    print(f"\nRun logged to: {log_path}\n")
+    run_id = log_run(log_data)
+    print(f"\nRun {run_id} logged to: {get_run_logger().path}\n")
 
 
 if __name__ == "__main__":
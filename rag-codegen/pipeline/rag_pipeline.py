@@ -1,25 +1,77 @@
-import pickle
+import asyncio
+import time
 
 from ingestion.embedder import Embedder
+from ingestion.batcher import EmbeddingBatcher
+from vectorstore.faiss_index import FAISSIndex
+from vectorstore.lexical_index import load_lexical_index
 from vectorstore.retriever import Retriever
-from generation.llm_client import llm_client as LLMClient
+from generation.llm_client import llm_client as LLMClient, AsyncLLMClient, GENERATION_PARAMS
+from generation.response_cache import ResponseCache
 from prompt.templates import code_generation_prompt
+from prompt.context_packer import pack_context, DEFAULT_TOKEN_BUDGET
 from prompt.normalizer import normalize_prompt
-from postprocess.cleaner import clean_output
+from postprocess.cleaner import clean_output, StreamingOutputParser
+from ingestion.chunker import count_tokens
+from utils import tracing
+
+CONTEXT_TOKENS = tracing.counter(
+    "rag_context_tokens_total", "Retrieved context tokens packed into / left out of prompts"
+)
+LLM_OUTPUT_TOKENS = tracing.counter(
+    "rag_llm_output_tokens_total", "Tokens in uncached LLM completions"
+)
 
 
 class RAGPipeline:
-    def __init__(self):
+    def __init__(
+        self,
+        embed_batch_size: int = 32,
+        embed_max_wait_ms: float = 5.0,
+        retrieve_top_k: int = 8,
+        context_token_budget: int = DEFAULT_TOKEN_BUDGET,
+    ):
         self.embedder = Embedder()
+        # Concurrent requests share one encode call per micro-batch
+        self.embed_batcher = EmbeddingBatcher(
+            self.embedder,
+            max_batch_size=embed_batch_size,
+            max_wait_ms=embed_max_wait_ms,
+        )
+        # Candidates retrieved, then packed into the prompt under the budget
+        self.retrieve_top_k = retrieve_top_k
+        self.context_token_budget = context_token_budget
         self.llm = LLMClient()
+        self._async_llm = None
+        # Exact-match completion cache (LLM_CACHE_BACKEND=none disables it)
+        self.response_cache = ResponseCache.from_env()
+
+        # Load persisted FAISS index (memory-mapped, no pickle)
+        index = FAISSIndex.load()
+        # BM25 index built with it; None for indexes built before hybrid search
+        lexical = load_lexical_index()
+
+        self.retriever = Retriever(index, lexical)
 
-        # Load persisted FAISS index
-        with open("vectorstore/faiss_store.pkl", "rb") as f:
-            index = pickle.load(f)
+        tracing.register_collector("rag_pipeline", self._collect_metrics)
 
-        self.retriever = Retriever(index)
+    @property
+    def async_llm(self) -> AsyncLLMClient:
+        # Created on first use so the sync CLI path never opens a pool
+        if self._async_llm is None:
+            self._async_llm = AsyncLLMClient(self.llm.backend)
+        return self._async_llm
 
-    def run(self, user_task: str, language: str, use_rag: bool = True):
+    async def aclose(self):
+        """
+        Stops the embedding batcher thread and closes the LLM backend's
+        connection pools (shared by the sync and async clients).
+        """
+        await asyncio.to_thread(self.embed_batcher.close)
+        await self.llm.backend.aclose()
+        self._async_llm = None
+
+    def run(self, user_task: str, language: str, use_rag: bool = True, use_cache: bool = True):
         """
         Executes the RAG / non-RAG pipeline with prompt normalization.
 
@@ -27,11 +79,130 @@ class RAGPipeline:
             user_task (str): User-entered problem statement
             language (str): Programming language
             use_rag (bool): Whether to use retrieval augmentation
+            use_cache (bool): Whether a cached completion may be returned
 
         Returns:
-            dict: code, explanation, retrieved_context, use_rag
+            dict: code, explanation, retrieved_context, context_packing,
+                  use_rag, intent, cached
         """
+        query_embedding = None
+        if use_rag:
+            with tracing.span("embed"):
+                query_embedding = self.embed_batcher.embed_one(user_task)
+
+        prompt, context, intent_data, packing = self._build_prompt(
+            user_task, language, use_rag, query_embedding
+        )
 
+        # -----------------------------
+        # STEP 4: LLM Generation (exact-match cache first)
+        # -----------------------------
+        raw_output = self._cached_completion(self.llm, prompt, use_cache)
+        cached = raw_output is not None
+
+        if not cached:
+            with tracing.span("llm"):
+                raw_output = self.llm.generate(prompt)
+            self._store_completion(self.llm, prompt, raw_output)
+
+        return self._finish(raw_output, context, use_rag, intent_data, packing, cached)
+
+    async def arun(self, user_task: str, language: str, use_rag: bool = True, use_cache: bool = True):
+        """
+        Async variant of run() for the API.
+
+        Embedding waits on the micro-batcher's future and FAISS search runs
+        in a worker thread, so the event loop is never blocked; the LLM call
+        goes through the pooled async client.
+        """
+        query_embedding = None
+        if use_rag:
+            with tracing.span("embed"):
+                query_embedding = await asyncio.wrap_future(
+                    self.embed_batcher.submit(user_task)
+                )
+
+        prompt, context, intent_data, packing = await asyncio.to_thread(
+            self._build_prompt, user_task, language, use_rag, query_embedding
+        )
+
+        # Disk cache lookups are SQLite queries; keep them off the event loop
+        raw_output = await asyncio.to_thread(
+            self._cached_completion, self.async_llm, prompt, use_cache
+        )
+        cached = raw_output is not None
+
+        if not cached:
+            with tracing.span("llm"):
+                raw_output = await self.async_llm.generate(prompt)
+            await asyncio.to_thread(self._store_completion, self.async_llm, prompt, raw_output)
+
+        return self._finish(raw_output, context, use_rag, intent_data, packing, cached)
+
+    async def astream(self, user_task: str, language: str, use_rag: bool = True, use_cache: bool = True):
+        """
+        Streaming variant of arun().
+
+        Yields (event, data) pairs: "code" / "explanation" text deltas as
+        tokens arrive, then a final "done" event with the cleaned output
+        and time-to-first-token.
+        """
+        start = time.perf_counter()
+
+        query_embedding = None
+        if use_rag:
+            with tracing.span("embed"):
+                query_embedding = await asyncio.wrap_future(
+                    self.embed_batcher.submit(user_task)
+                )
+
+        prompt, context, intent_data, packing = await asyncio.to_thread(
+            self._build_prompt, user_task, language, use_rag, query_embedding
+        )
+
+        parser = StreamingOutputParser()
+        raw_parts = []
+        ttft_ms = None
+
+        cached_output = await asyncio.to_thread(
+            self._cached_completion, self.async_llm, prompt, use_cache
+        )
+        if cached_output is not None:
+            deltas = _single_chunk(cached_output)
+        else:
+            deltas = self.async_llm.stream(prompt)
+
+        async for delta in deltas:
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000
+                tracing.observe_ttft("generate_stream", ttft_ms / 1000)
+            raw_parts.append(delta)
+
+            for section, text in parser.feed(delta):
+                yield section, text
+
+        raw_output = "".join(raw_parts)
+        cached = cached_output is not None
+        if not cached:
+            await asyncio.to_thread(self._store_completion, self.async_llm, prompt, raw_output)
+
+        result = self._finish(raw_output, context, use_rag, intent_data, packing, cached)
+        result["ttft_ms"] = round(ttft_ms, 1) if ttft_ms is not None else None
+        result["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        yield "done", result
+
+    def _cached_completion(self, llm, prompt, use_cache):
+        if self.response_cache is None or not use_cache:
+            return None
+        return self.response_cache.get(llm.model, GENERATION_PARAMS, prompt)
+
+    def _store_completion(self, llm, prompt, raw_output):
+        # Per-request bypass still refreshes the entry with the new completion
+        if self.response_cache is not None and raw_output:
+            self.response_cache.set(llm.model, GENERATION_PARAMS, prompt, raw_output)
+
+    def _build_prompt(self, user_task, language, use_rag, query_embedding):
         # -----------------------------
         # STEP 1: Normalize / infer intent
         # -----------------------------
@@ -47,48 +218,91 @@ class RAGPipeline:
         # STEP 2: Retrieve context (if RAG enabled)
         # -----------------------------
         context = ""
-        retrieved_chunks = []
+        packing = None
 
         if use_rag:
-            query_embedding = self.embedder.embed(user_task)[0]
-            retrieved_chunks = self.retriever.retrieve(query_embedding, top_k=3)
+            # Language is filtered inside the index search, not afterwards
+            with tracing.span("retrieve"):
+                retrieved_chunks = self.retriever.retrieve(
+                    query_embedding,
+                    top_k=self.retrieve_top_k,
+                    language=language,
+                    query_text=user_task
+                )
 
-            context = "\n\n".join(
-                chunk["text"]
-                for chunk in retrieved_chunks
-                if chunk.get("language", "").lower() == language.lower()
-            )
+            # MMR selection under the token budget, near-duplicates dropped
+            with tracing.span("context_pack"):
+                packed_chunks, packing = pack_context(
+                    retrieved_chunks, token_budget=self.context_token_budget
+                )
+            CONTEXT_TOKENS.inc(packing["tokens_used"], kind="used")
+            CONTEXT_TOKENS.inc(packing["tokens_saved"], kind="saved")
+
+            context = "\n\n".join(chunk["text"] for chunk in packed_chunks)
 
         # -----------------------------
         # STEP 3: Build final prompt
         # -----------------------------
-        if inferred_constraints:
-            context = (
-                context
-                + "\n\nINFERRED CONSTRAINTS:\n"
-                + inferred_constraints
-            )
+        with tracing.span("prompt_build"):
+            if inferred_constraints:
+                context = (
+                    context
+                    + "\n\nINFERRED CONSTRAINTS:\n"
+                    + inferred_constraints
+                )
 
-        prompt = code_generation_prompt(
-            user_task=user_task,
-            language=language,
-            context=context
-        )
+            prompt = code_generation_prompt(
+                user_task=user_task,
+                language=language,
+                context=context
+            )
 
-        # -----------------------------
-        # STEP 4: LLM Generation
-        # -----------------------------
-        raw_output = self.llm.generate(prompt)
+        return prompt, context, intent_data, packing
 
+    def _finish(self, raw_output, context, use_rag, intent_data, packing=None, cached=False):
         # -----------------------------
         # STEP 5: Post-process output
         # -----------------------------
-        cleaned = clean_output(raw_output)
+        with tracing.span("postprocess"):
+            cleaned = clean_output(raw_output)
+
+        if tracing.ENABLED and not cached:
+            LLM_OUTPUT_TOKENS.inc(count_tokens(raw_output or ""))
 
         return {
             "code": cleaned["code"],
             "explanation": cleaned["explanation"],
             "retrieved_context": context,
+            "context_packing": packing,
             "use_rag": use_rag,
-            "intent": intent_data["intent"]
+            "intent": intent_data["intent"],
+            "cached": cached
         }
+
+    def _collect_metrics(self):
+        """
+        Cache and batcher stats for /metrics, read at scrape time.
+        """
+        samples = []
+        if self.response_cache is not None:
+            for result, value in self.response_cache.stats.items():
+                samples.append((
+                    "rag_llm_cache_lookups_total", "counter",
+                    "LLM response cache lookups", {"result": result}, value
+                ))
+        if self.embedder.cache is not None:
+            for result, value in self.embedder.cache.stats.items():
+                samples.append((
+                    "rag_embedding_cache_lookups_total", "counter",
+                    "Embedding cache lookups", {"result": result}, value
+                ))
+        for name, value in self.embed_batcher.stats.items():
+            samples.append((
+                f"rag_embed_batcher_{name}_total", "counter",
+                f"Embedding micro-batcher {name}", None, value
+            ))
+        return samples
+
+
+async def _single_chunk(text):
+    yield text
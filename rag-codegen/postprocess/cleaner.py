@@ -12,3 +12,92 @@ def clean_output(text: str) -> dict:
         "code": code,
         "explanation": explanation
     }
+
+
+SECTION_TAGS = {
+    "code": ("<CODE>", "</CODE>"),
+    "explanation": ("<EXPLANATION>", "</EXPLANATION>"),
+}
+ALL_TAGS = [tag for tags in SECTION_TAGS.values() for tag in tags]
+
+
+class StreamingOutputParser:
+    """
+    Incremental counterpart of clean_output for streamed completions.
+
+    feed() takes raw token text and returns (section, delta) pairs for
+    text inside <CODE> / <EXPLANATION>. As in clean_output, each section
+    is tracked on its own: it starts at its first opening tag and ends
+    at its next opening or closing tag, and any other tag inside it is
+    literal text (so sections can overlap). Tags split across chunks
+    are held back until complete, and each section is stripped like
+    clean_output does (leading whitespace dropped, trailing whitespace
+    only emitted if more text follows).
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        # section -> "waiting" | "open" | "closed"
+        self._state = {section: "waiting" for section in SECTION_TAGS}
+        self._started = {section: False for section in SECTION_TAGS}
+        self._pending_ws = {section: "" for section in SECTION_TAGS}
+
+    def feed(self, text: str):
+        events = []
+        self._buffer += text
+
+        while self._buffer:
+            idx = self._buffer.find("<")
+            if idx == -1:
+                self._emit(self._buffer, events)
+                self._buffer = ""
+                break
+
+            self._emit(self._buffer[:idx], events)
+            self._buffer = self._buffer[idx:]
+
+            tag = next((t for t in ALL_TAGS if self._buffer.startswith(t)), None)
+            if tag:
+                self._tag(tag, events)
+                self._buffer = self._buffer[len(tag):]
+            elif any(t.startswith(self._buffer) for t in ALL_TAGS):
+                # Possible tag split across chunks; wait for more text
+                break
+            else:
+                self._emit("<", events)
+                self._buffer = self._buffer[1:]
+
+        return events
+
+    def _tag(self, tag, events):
+        for section, tags in SECTION_TAGS.items():
+            state = self._state[section]
+            if state == "open" and tag in tags:
+                self._state[section] = "closed"
+            elif state == "open":
+                # Another section's tag inside this one is plain text
+                self._emit_to(section, tag, events)
+            elif state == "waiting" and tag == tags[0]:
+                self._state[section] = "open"
+
+    def _emit(self, text, events):
+        for section, state in self._state.items():
+            if state == "open":
+                self._emit_to(section, text, events)
+
+    def _emit_to(self, section, text, events):
+        if not text:
+            return
+
+        if not self._started[section]:
+            text = text.lstrip()
+            if not text:
+                return
+            self._started[section] = True
+
+        body = text.rstrip()
+        if body:
+            events.append((section, self._pending_ws[section] + body))
+            self._pending_ws[section] = text[len(body):]
+        else:
+            self._pending_ws[section] += text
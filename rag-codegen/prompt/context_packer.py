@@ -0,0 +1,105 @@
+from ingestion.chunker import count_tokens
+from vectorstore.lexical_index import tokenize_code
+
+DEFAULT_TOKEN_BUDGET = 512
+# Weight of relevance vs. novelty in MMR (1.0 = pure relevance order)
+DEFAULT_MMR_LAMBDA = 0.7
+# Token-set Jaccard similarity above which a chunk counts as a duplicate
+DEFAULT_DUPLICATE_THRESHOLD = 0.8
+
+
+def _chunk_tokens(chunk):
+    # Precomputed at index time; older indexes fall back to counting
+    tokens = chunk.get("tokens")
+    return tokens if tokens is not None else count_tokens(chunk["text"])
+
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _overlapping_lines(a, b):
+    """
+    True when two chunks cover mostly the same lines of the same file
+    (e.g. neighbouring windows or a method and its enclosing class).
+    """
+    if a.get("source") is None or a.get("source") != b.get("source"):
+        return False
+    if a.get("start_line") is None or b.get("start_line") is None:
+        return False
+
+    overlap = min(a["end_line"], b["end_line"]) - max(a["start_line"], b["start_line"]) + 1
+    shorter = min(a["end_line"] - a["start_line"], b["end_line"] - b["start_line"]) + 1
+    return overlap > shorter / 2
+
+
+def pack_context(
+    chunks,
+    token_budget=DEFAULT_TOKEN_BUDGET,
+    mmr_lambda=DEFAULT_MMR_LAMBDA,
+    duplicate_threshold=DEFAULT_DUPLICATE_THRESHOLD,
+):
+    """
+    Selects retrieved chunks for the prompt by maximal marginal
+    relevance under a token budget.
+
+    chunks must be in retrieval order (best first); relevance is taken
+    from that rank. Similarity between chunks is lexical (token-set
+    Jaccard), so no vectors are needed. Near-duplicates are dropped
+    outright; chunks that would overflow the budget are skipped in
+    favour of smaller ones.
+
+    Returns (selected chunks, report) where report counts candidates,
+    duplicates dropped, tokens used and tokens saved versus joining
+    every candidate.
+    """
+    n = len(chunks)
+    relevance = [1.0 - i / n for i in range(n)]
+    token_sets = [set(tokenize_code(c["text"])) for c in chunks]
+    costs = [_chunk_tokens(c) for c in chunks]
+
+    selected = []
+    remaining = list(range(n))
+    duplicates = 0
+    used = 0
+
+    while remaining:
+        best, best_score = None, None
+        for i in list(remaining):
+            if used + costs[i] > token_budget:
+                remaining.remove(i)
+                continue
+
+            redundancy = max(
+                (_jaccard(token_sets[i], token_sets[j]) for j in selected),
+                default=0.0,
+            )
+            if redundancy >= duplicate_threshold or any(
+                _overlapping_lines(chunks[i], chunks[j]) for j in selected
+            ):
+                remaining.remove(i)
+                duplicates += 1
+                continue
+
+            score = mmr_lambda * relevance[i] - (1 - mmr_lambda) * redundancy
+            if best_score is None or score > best_score:
+                best, best_score = i, score
+
+        if best is None:
+            break
+
+        selected.append(best)
+        remaining.remove(best)
+        used += costs[best]
+
+    report = {
+        "candidates": n,
+        "selected": len(selected),
+        "duplicates_dropped": duplicates,
+        "token_budget": token_budget,
+        "tokens_used": used,
+        "tokens_saved": sum(costs) - used,
+    }
+    return [chunks[i] for i in selected], report
@@ -1,14 +1,15 @@
 import json
-import os
 from typing import List, Dict, Any
 
-from huggingface_hub import InferenceClient
+from generation.backends import GenerationBackend, backend_from_env
 
 
 class AITestGenerator:
     """
     Uses an LLM (separate from code-generation model)
     to generate adversarial / edge test cases.
+
+    The backend comes from LLM_BACKEND unless one is passed in.
     """
 
     def __init__(
@@ -16,13 +17,12 @@ class AITestGenerator:
         model: str = "mistralai/Mistral-7B-Instruct-v0.2",
         temperature: float = 0.3,
         max_tokens: int = 512,
+        backend: GenerationBackend = None,
     ):
-        self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
-        self.client = InferenceClient(
-            api_key=os.getenv("HF_API_KEY")
-        )
+        self.backend = backend or backend_from_env(model=model)
+        self.model = self.backend.model
 
     def generate_test_cases(
         self,
@@ -62,19 +62,11 @@ Return ONLY valid JSON in the following format:
 
         try:
             # ✅ CORRECT: chat-based generation
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
+            raw_text = self.backend.generate(
+                prompt,
                 max_tokens=self.max_tokens,
                 temperature=self.temperature,
-            )
-
-            raw_text = response.choices[0].message.content.strip()
+            ).strip()
 
             # Attempt to extract JSON safely
             json_start = raw_text.find("[")
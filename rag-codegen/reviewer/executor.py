@@ -1,105 +1,241 @@
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional, Tuple
 import inspect
+import time
 
 from reviewer.sandbox import CodeSandbox, SandboxExecutionError
+from reviewer.worker_pool import SandboxWorkerPool
+from utils import tracing
+
+
+def error_result(tc: Dict[str, Any], error: str) -> Dict[str, Any]:
+    return {
+        "name": tc.get("name", "unknown"),
+        "input": tc.get("input", {}),
+        "output": None,
+        "error": error,
+    }
+
+
+def load_function(sandbox: CodeSandbox, code: str, function_name: str):
+    """
+    Loads code into the sandbox and returns (fn, param_names).
+
+    Raises SandboxExecutionError if the code or function is invalid.
+    """
+    namespace = sandbox.load_code(code)
+    fn = sandbox.extract_function(namespace, function_name)
+    sig = inspect.signature(fn)
+    return fn, list(sig.parameters)
+
+
+def run_test_case(
+    fn: Callable,
+    param_names: List[str],
+    tc: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Calls fn with one test case's inputs and captures output or error.
+    """
+    name = tc.get("name", "unknown")
+    inputs = tc.get("input", {})
+
+    try:
+        # Case 1: Proper keyword arguments
+        if inputs:
+            # Normalize single-argument string inputs
+            if len(param_names) == 1:
+                key = param_names[0]
+                value = inputs.get(key)
+
+                # Normalize None / string inputs for single-argument numeric functions
+                if value is None:
+                    value = 0
+
+                elif isinstance(value, str):
+                    value = value.strip()
+                    if value == "":
+                        value = 0
+                    else:
+                        try:
+                            value = int(value)
+                        except ValueError:
+                            raise ValueError("Non-numeric input for numeric function")
+
+
+                output = fn(value)
+            else:
+                try:
+                    output = fn(**inputs)
+                except TypeError:
+                    output = fn(*inputs.values())
+
+        else:
+            # Case 3: Empty input handling
+            if len(param_names) == 1:
+                # Treat empty input as default zero
+                output = fn(0)
+            else:
+                raise TypeError("No inputs provided for multi-argument function")
+
+        return {
+            "name": name,
+            "input": inputs,
+            "output": output,
+            "error": None,
+        }
+
+    except Exception as e:
+        # MemoryError and friends have no message
+        return error_result(tc, str(e) or type(e).__name__)
 
 
 class CodeExecutor:
     """
     Executes AI-generated code against test cases
     inside a restricted sandbox.
+
+    By default code runs in a pool of warm worker processes with
+    per-test wall-clock / CPU timeouts and a memory limit, so a hung
+    or runaway solution cannot take down the API process. Test cases
+    (and candidate solutions) are fanned out across the workers.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        use_process_pool: bool = True,
+        pool_size: int = None,
+        per_test_timeout_s: float = 2.0,
+        cpu_timeout_s: float = 1.0,
+        memory_limit_mb: int = 512,
+        time_budget_s: Optional[float] = None,
+    ):
         self.sandbox = CodeSandbox()
-
+        self.time_budget_s = time_budget_s
+        self.pool = None
+        self._dispatch = None
+        if use_process_pool:
+            self.pool = SandboxWorkerPool(
+                size=pool_size,
+                per_test_timeout_s=per_test_timeout_s,
+                cpu_timeout_s=cpu_timeout_s,
+                memory_limit_mb=memory_limit_mb,
+            )
+            # Threads only wait on worker pipes; the pool bounds real parallelism
+            self._dispatch = ThreadPoolExecutor(
+                max_workers=self.pool.size * 4,
+                thread_name_prefix="sandbox-dispatch",
+            )
+            tracing.register_collector("code_executor", self._collect_metrics)
+
+    def close(self):
+        """
+        Stops the dispatch threads and the sandbox worker processes.
+        """
+        if self._dispatch is not None:
+            self._dispatch.shutdown(wait=True)
+        if self.pool is not None:
+            self.pool.close()
+
+    def _collect_metrics(self):
+        return [
+            ("sandbox_pool_events_total", "counter", "Sandbox worker timeouts / crashes / restarts",
+             {"event": event}, value)
+            for event, value in self.pool.stats.items()
+        ]
+
+    def _deadline(self, time_budget_s):
+        budget = time_budget_s if time_budget_s is not None else self.time_budget_s
+        return None if budget is None else time.monotonic() + budget
+
+    def _shards(self, test_cases, n_shards):
+        """
+        Splits test cases into contiguous shards so concatenating the
+        shard results keeps the original order.
+        """
+        n_shards = max(1, min(n_shards, len(test_cases)))
+        size, extra = divmod(len(test_cases), n_shards)
+        shards, start = [], 0
+        for i in range(n_shards):
+            end = start + size + (1 if i < extra else 0)
+            shards.append(test_cases[start:end])
+            start = end
+        return shards
+
+    def _submit_shards(self, code, function_name, test_cases, n_shards, deadline):
+        return [
+            self._dispatch.submit(self.pool.run, code, function_name, shard, deadline)
+            for shard in self._shards(test_cases, n_shards)
+        ]
+
+    @tracing.traced("sandbox_execute")
     def run_tests(
         self,
         code: str,
         function_name: str,
         test_cases: List[Dict[str, Any]],
+        time_budget_s: Optional[float] = None,
     ) -> List[Dict[str, Any]]:
         """
         Runs the given function against provided test cases.
 
-        Returns execution results for each test case.
+        Test cases run in parallel across sandbox workers. If the suite
+        exceeds time_budget_s, finished results are kept and the rest
+        are reported with a budget error.
+
+        Returns execution results for each test case, in order.
         """
+        if not test_cases:
+            return []
 
-        # Load code into sandbox
+        if self.pool is not None:
+            deadline = self._deadline(time_budget_s)
+            futures = self._submit_shards(
+                code, function_name, test_cases, self.pool.size, deadline
+            )
+            return [result for f in futures for result in f.result()]
+
+        # In-process fallback (no isolation or timeouts)
         try:
-            namespace = self.sandbox.load_code(code)
-            fn = self.sandbox.extract_function(namespace, function_name)
-            sig = inspect.signature(fn)
-            param_names = list(sig.parameters)
+            fn, param_names = load_function(self.sandbox, code, function_name)
         except SandboxExecutionError as e:
             # If code itself is invalid, mark all tests as failed
-            return [
-                {
-                    "name": tc.get("name", "unknown"),
-                    "input": tc.get("input", {}),
-                    "output": None,
-                    "error": str(e),
-                }
-                for tc in test_cases
-            ]
+            return [error_result(tc, str(e)) for tc in test_cases]
 
-        results = []
+        return [run_test_case(fn, param_names, tc) for tc in test_cases]
 
-        for tc in test_cases:
-            name = tc.get("name", "unknown")
-            inputs = tc.get("input", {})
+    @tracing.traced("sandbox_execute_candidates")
+    def run_candidates(
+        self,
+        candidates: List[Tuple[str, str]],
+        test_cases: List[Dict[str, Any]],
+        time_budget_s: Optional[float] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Runs several (code, function_name) candidates against the same
+        test cases, all sharing the workers and one suite time budget.
 
-            try:
-                # Case 1: Proper keyword arguments
-                if inputs:
-                    # Normalize single-argument string inputs
-                    if len(param_names) == 1:
-                        key = param_names[0]
-                        value = inputs.get(key)
+        Returns one result list per candidate, in candidate order.
+        """
+        if self.pool is None:
+            return [
+                self.run_tests(code, function_name, test_cases)
+                for code, function_name in candidates
+            ]
 
-                        # Normalize None / string inputs for single-argument numeric functions
-                        if value is None:
-                            value = 0
+        if not test_cases:
+            return [[] for _ in candidates]
 
-                        elif isinstance(value, str):
-                            value = value.strip()
-                            if value == "":
-                                value = 0
-                            else:
-                                try:
-                                    value = int(value)
-                                except ValueError:
-                                    raise ValueError("Non-numeric input for numeric function")
+        deadline = self._deadline(time_budget_s)
+        # Spread workers over candidates; at least one shard each
+        n_shards = max(1, self.pool.size // max(1, len(candidates)))
 
+        per_candidate = [
+            self._submit_shards(code, function_name, test_cases, n_shards, deadline)
+            for code, function_name in candidates
+        ]
 
-                        output = fn(value)
-                    else:
-                        try:
-                            output = fn(**inputs)
-                        except TypeError:
-                            output = fn(*inputs.values())
-
-                else:
-                    # Case 3: Empty input handling
-                    if len(param_names) == 1:
-                        # Treat empty input as default zero
-                        output = fn(0)
-                    else:
-                        raise TypeError("No inputs provided for multi-argument function")
-
-                results.append({
-                    "name": name,
-                    "input": inputs,
-                    "output": output,
-                    "error": None,
-                })
-
-            except Exception as e:
-                results.append({
-                    "name": name,
-                    "input": inputs,
-                    "output": None,
-                    "error": str(e),
-                })
-
-        return results
+        return [
+            [result for f in futures for result in f.result()]
+            for futures in per_candidate
+        ]
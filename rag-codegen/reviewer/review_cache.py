@@ -0,0 +1,132 @@
+import ast
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from generation.response_cache import (
+    ResponseCacheBackend,
+    MemoryCacheBackend,
+    DiskCacheBackend,
+)
+from reviewer.worker_pool import (
+    BUDGET_EXCEEDED_ERROR,
+    TIMEOUT_ERROR_PREFIX,
+    WORKER_CRASHED_ERROR,
+)
+from utils import tracing
+
+DEFAULT_REVIEW_CACHE_PATH = "cache/reviews.sqlite"
+
+
+def code_fingerprint(code: str) -> str:
+    """
+    Hash of the code's AST, so formatting, comments and quoting
+    differences map to the same key.
+    """
+    tree = ast.dump(ast.parse(code), include_attributes=False)
+    return hashlib.sha256(tree.encode("utf-8")).hexdigest()
+
+
+def test_suite_fingerprint(test_cases: List[Dict[str, Any]]) -> str:
+    """
+    Hash of the test names, inputs and expected outputs (after oracles
+    have filled them in).
+    """
+    suite = [
+        [tc.get("name"), tc.get("input", {}), tc.get("expected")]
+        for tc in test_cases
+    ]
+    payload = json.dumps(suite, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def review_cache_key(code: str, function_name: str, test_cases: List[Dict[str, Any]]) -> str:
+    payload = "\0".join([
+        code_fingerprint(code),
+        function_name or "",
+        test_suite_fingerprint(test_cases),
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _is_transient(report: Dict[str, Any]) -> bool:
+    # Budget, wall-clock and worker failures can depend on load, not the code
+    for result in report.get("results", []):
+        error = result.get("error") or ""
+        if error in (BUDGET_EXCEEDED_ERROR, WORKER_CRASHED_ERROR) or error.startswith(TIMEOUT_ERROR_PREFIX):
+            return True
+    return False
+
+
+class ReviewCache:
+    """
+    CodeValidator.validate reports keyed by sanitized code AST,
+    function name and test-suite fingerprint.
+
+    Reviews are deterministic for a given (code, tests) pair, so a
+    repeated generation returns the stored report without executing
+    anything. Reports with timeouts or sandbox crashes are not stored,
+    nor are reports that JSON would not return unchanged.
+    """
+
+    def __init__(self, backend: ResponseCacheBackend, ttl_s: float = 7 * 24 * 3600):
+        self.backend = backend
+        self.ttl_s = ttl_s
+        self.stats = {"hits": 0, "misses": 0, "skipped": 0}
+        tracing.register_collector("review_cache", self._collect_metrics)
+
+    def _collect_metrics(self):
+        return [
+            ("review_cache_lookups_total", "counter",
+             "Review cache lookups (skipped = report not cacheable)", {"result": result}, value)
+            for result, value in self.stats.items()
+        ]
+
+    @classmethod
+    def from_env(cls) -> Optional["ReviewCache"]:
+        """
+        REVIEW_CACHE_BACKEND: memory (default) | disk | none
+        REVIEW_CACHE_TTL_S, REVIEW_CACHE_MAX_ENTRIES, REVIEW_CACHE_PATH
+        """
+        kind = os.getenv("REVIEW_CACHE_BACKEND", "memory").lower()
+        ttl_s = float(os.getenv("REVIEW_CACHE_TTL_S", str(7 * 24 * 3600)))
+        max_entries = os.getenv("REVIEW_CACHE_MAX_ENTRIES")
+
+        if kind == "none":
+            return None
+        if kind == "disk":
+            backend = DiskCacheBackend(
+                path=os.getenv("REVIEW_CACHE_PATH", DEFAULT_REVIEW_CACHE_PATH),
+                max_entries=int(max_entries or 100000),
+            )
+        elif kind == "memory":
+            backend = MemoryCacheBackend(max_entries=int(max_entries or 2000))
+        else:
+            raise ValueError(f"Unknown REVIEW_CACHE_BACKEND '{kind}'")
+
+        return cls(backend, ttl_s=ttl_s)
+
+    def get(self, code: str, function_name: str, test_cases) -> Optional[Dict[str, Any]]:
+        value = self.backend.get(review_cache_key(code, function_name, test_cases), self.ttl_s)
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        # Decoded per hit, so callers can't mutate the stored report
+        return json.loads(value)
+
+    def set(self, code: str, function_name: str, test_cases, report: Dict[str, Any]) -> None:
+        if _is_transient(report):
+            self.stats["skipped"] += 1
+            return
+        try:
+            value = json.dumps(report)
+        except (TypeError, ValueError):
+            value = None
+        # Only cache reports a hit returns unchanged: JSON would turn
+        # tuples into lists and int keys into strings
+        if value is None or json.loads(value) != report:
+            self.stats["skipped"] += 1
+            return
+        self.backend.set(review_cache_key(code, function_name, test_cases), value)
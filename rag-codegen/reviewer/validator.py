@@ -1,5 +1,9 @@
 from typing import List, Dict, Any
 from reviewer.confidence import ConfidenceScorer
+from utils import tracing
+
+TEST_OUTCOMES = tracing.counter("review_test_outcomes_total", "Validated tests by status")
+REVIEW_VERDICTS = tracing.counter("review_verdicts_total", "Review reports by overall status")
 
 class CodeValidator:
     """
@@ -7,6 +11,7 @@ class CodeValidator:
     and produces a structured review report.
     """
 
+    @tracing.traced("validate")
     def validate(
         self,
         execution_results: List[Dict[str, Any]],
@@ -82,6 +87,11 @@ class CodeValidator:
             },
         )
 
+        TEST_OUTCOMES.inc(passed, status="PASS")
+        TEST_OUTCOMES.inc(failed, status="FAIL")
+        TEST_OUTCOMES.inc(unknown, status="UNKNOWN")
+        REVIEW_VERDICTS.inc(status=overall_status)
+
         return {
             "total_tests": len(results),
             "passed": passed,
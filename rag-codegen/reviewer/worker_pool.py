@@ -0,0 +1,320 @@
+import atexit
+import multiprocessing as mp
+import os
+import pickle
+import queue
+import signal
+import threading
+import time
+from typing import List, Dict, Any
+
+try:
+    import resource
+except ImportError:  # non-POSIX: no rlimits
+    resource = None
+
+
+class WorkerTimeout(Exception):
+    pass
+
+
+class WorkerCrashed(Exception):
+    pass
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+BUDGET_EXCEEDED_ERROR = "Suite time budget exceeded"
+TIMEOUT_ERROR_PREFIX = "Timed out after"
+WORKER_CRASHED_ERROR = "Sandbox worker crashed (resource limit exceeded?)"
+
+# Wait for a worker's end-of-job message once every result is in
+DONE_TIMEOUT_S = 0.5
+
+
+class _CPUTimeExceeded(Exception):
+    pass
+
+
+def _raise_cpu_timeout(signum, frame):
+    raise _CPUTimeExceeded("CPU time limit exceeded")
+
+
+def _picklable(result: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        pickle.dumps(result)
+        return result
+    except Exception:
+        return {
+            **result,
+            "output": None,
+            "error": f"Unserializable output of type {type(result['output']).__name__}",
+        }
+
+
+def _worker_main(conn, memory_limit_mb):
+    """
+    Worker loop: keeps a ready CodeSandbox (safe builtins prepared) and
+    executes one job at a time, streaming back one result per test.
+    """
+    # Imported here to avoid a circular import with reviewer.executor
+    from reviewer.sandbox import CodeSandbox, SandboxExecutionError
+    from reviewer.executor import load_function, run_test_case, error_result
+
+    if resource is not None and memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    can_limit_cpu = hasattr(signal, "setitimer")
+    if can_limit_cpu:
+        signal.signal(signal.SIGPROF, _raise_cpu_timeout)
+
+    # Parent handles Ctrl+C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    sandbox = CodeSandbox()
+
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+
+        code, function_name, test_cases, cpu_timeout_s = job
+
+        try:
+            if can_limit_cpu:
+                signal.setitimer(signal.ITIMER_PROF, cpu_timeout_s)
+            try:
+                fn, param_names = load_function(sandbox, code, function_name)
+            finally:
+                if can_limit_cpu:
+                    signal.setitimer(signal.ITIMER_PROF, 0)
+        except (SandboxExecutionError, _CPUTimeExceeded, MemoryError) as e:
+            conn.send(("load_error", str(e)))
+            continue
+
+        conn.send(("loaded", None))
+
+        for tc in test_cases:
+            if can_limit_cpu:
+                signal.setitimer(signal.ITIMER_PROF, cpu_timeout_s)
+            try:
+                result = run_test_case(fn, param_names, tc)
+            except _CPUTimeExceeded as e:
+                # Raised between the user call returning and the timer reset
+                result = error_result(tc, str(e))
+            finally:
+                if can_limit_cpu:
+                    signal.setitimer(signal.ITIMER_PROF, 0)
+
+            conn.send(("result", _picklable(result)))
+
+        conn.send(("done", None))
+
+
+class _Worker:
+    def __init__(self, ctx, memory_limit_mb):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, memory_limit_mb),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def send(self, job):
+        try:
+            self.conn.send(job)
+        except (BrokenPipeError, OSError):
+            raise WorkerCrashed()
+
+    def recv(self, timeout_s):
+        if not self.conn.poll(timeout_s):
+            raise WorkerTimeout()
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError):
+            raise WorkerCrashed()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class SandboxWorkerPool:
+    """
+    Pool of pre-started sandbox worker processes.
+
+    Every test gets a wall-clock timeout (enforced by the parent) and a
+    CPU-time timeout (SIGPROF in the worker); workers run under an
+    address-space rlimit. A worker that times out or dies is killed
+    and replaced, and the remaining tests continue on the new one.
+    """
+
+    def __init__(
+        self,
+        size: int = None,
+        per_test_timeout_s: float = 2.0,
+        cpu_timeout_s: float = 1.0,
+        memory_limit_mb: int = 512,
+        load_timeout_s: float = None,
+    ):
+        self.size = size or min(4, os.cpu_count() or 1)
+        self.per_test_timeout_s = per_test_timeout_s
+        self.cpu_timeout_s = cpu_timeout_s
+        self.memory_limit_mb = memory_limit_mb
+        self.load_timeout_s = load_timeout_s or per_test_timeout_s
+
+        # forkserver avoids forking the threaded API process itself
+        method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        self._ctx = mp.get_context(method)
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self.stats = {"timeouts": 0, "crashes": 0, "restarts": 0}
+
+    def start(self):
+        """
+        Starts the workers; called lazily on first use.
+        """
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                self._idle.put(self._spawn())
+            self._started = True
+            atexit.register(self.close)
+
+    def _spawn(self):
+        return _Worker(self._ctx, self.memory_limit_mb)
+
+    def _release(self, worker, healthy):
+        if not healthy:
+            worker.kill()
+            self.stats["restarts"] += 1
+            worker = self._spawn()
+        self._idle.put(worker)
+
+    def _recv(self, worker, timeout_s, deadline):
+        """
+        Receives from a worker, bounded by both the per-step timeout
+        and the suite deadline (whichever comes first).
+        """
+        if deadline is None:
+            return worker.recv(timeout_s)
+
+        remaining = deadline - time.monotonic()
+        if remaining < timeout_s:
+            try:
+                return worker.recv(max(0.0, remaining))
+            except WorkerTimeout:
+                raise BudgetExceeded()
+        return worker.recv(timeout_s)
+
+    def run(
+        self,
+        code: str,
+        function_name: str,
+        test_cases: List[Dict[str, Any]],
+        deadline: float = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Runs test cases on one worker, preserving order.
+
+        deadline is a time.monotonic() value; tests still pending when it
+        passes are returned as errors alongside the finished results.
+        """
+        from reviewer.executor import error_result
+
+        self.start()
+
+        results = []
+        pending = list(test_cases)
+
+        while pending:
+            try:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                worker = self._idle.get(timeout=timeout)
+            except queue.Empty:
+                results.extend(error_result(tc, BUDGET_EXCEEDED_ERROR) for tc in pending)
+                break
+
+            healthy = True
+            loaded = False
+
+            try:
+                worker.send((code, function_name, pending, self.cpu_timeout_s))
+            except WorkerCrashed:
+                # Died while idle; not this job's fault, retry on a fresh worker
+                self._release(worker, healthy=False)
+                continue
+
+            try:
+                status, payload = self._recv(worker, self.load_timeout_s, deadline)
+                if status == "load_error":
+                    results.extend(error_result(tc, payload) for tc in pending)
+                    pending = []
+                    break
+                loaded = True
+
+                while pending:
+                    _, result = self._recv(worker, self.per_test_timeout_s, deadline)
+                    results.append(result)
+                    pending.pop(0)
+
+                # Every result is in; the "done" handshake is not charged to
+                # the suite deadline, it only decides if the worker is reused
+                try:
+                    worker.recv(DONE_TIMEOUT_S)
+                except (WorkerTimeout, WorkerCrashed):
+                    healthy = False
+
+            except BudgetExceeded:
+                healthy = False
+                results.extend(error_result(tc, BUDGET_EXCEEDED_ERROR) for tc in pending)
+                pending = []
+
+            except WorkerTimeout:
+                healthy = False
+                self.stats["timeouts"] += 1
+                if not loaded:
+                    error = f"Code loading timed out after {self.load_timeout_s}s"
+                    results.extend(error_result(tc, error) for tc in pending)
+                    pending = []
+                elif pending:
+                    error = f"{TIMEOUT_ERROR_PREFIX} {self.per_test_timeout_s}s"
+                    results.append(error_result(pending.pop(0), error))
+
+            except WorkerCrashed:
+                healthy = False
+                self.stats["crashes"] += 1
+                error = WORKER_CRASHED_ERROR
+                if not loaded:
+                    results.extend(error_result(tc, error) for tc in pending)
+                    pending = []
+                elif pending:
+                    results.append(error_result(pending.pop(0), error))
+
+            finally:
+                self._release(worker, healthy)
+
+        return results
+
+    def close(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker.conn.send(None)
+                worker.process.join(timeout=1)
+            except (BrokenPipeError, OSError):
+                pass
+            if worker.process.is_alive():
+                worker.kill()
+        self._started = False
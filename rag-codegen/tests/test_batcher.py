@@ -0,0 +1,60 @@
+import threading
+
+import numpy as np
+import pytest
+
+from ingestion.batcher import EmbeddingBatcher
+
+
+class BlockingEmbedder:
+    """
+    Stub embedder whose first embed() call waits until released.
+    """
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        if self.calls == 1:
+            self.started.set()
+            self.release.wait(5)
+        return np.ones((len(texts), 4), dtype="float32")
+
+
+def test_cancelled_future_does_not_stop_the_batcher():
+    embedder = BlockingEmbedder()
+    batcher = EmbeddingBatcher(embedder, max_wait_ms=1)
+    try:
+        in_flight = batcher.submit("in flight")
+        assert embedder.started.wait(5)
+        queued = batcher.submit("queued")
+
+        # Client disconnects: both futures are cancelled while pending
+        in_flight.cancel()
+        assert queued.cancel()
+        embedder.release.set()
+
+        later = batcher.submit("later")
+        assert later.result(timeout=5).shape == (4,)
+        assert batcher.stats["cancelled"] == 1
+    finally:
+        embedder.release.set()
+        batcher.close()
+
+
+def test_embed_error_is_raised_to_every_caller():
+    class FailingEmbedder:
+        def embed(self, texts):
+            raise ValueError("boom")
+
+    batcher = EmbeddingBatcher(FailingEmbedder(), max_wait_ms=1)
+    try:
+        with pytest.raises(ValueError):
+            batcher.submit("x").result(timeout=5)
+        # The worker keeps serving after a failed batch
+        assert isinstance(batcher.submit("y").exception(timeout=5), ValueError)
+    finally:
+        batcher.close()
@@ -0,0 +1,29 @@
+import pytest
+
+from postprocess.cleaner import clean_output, StreamingOutputParser
+
+OUTPUTS = [
+    "<CODE>\ndef f(x):\n    return x\n</CODE>\n<EXPLANATION>\nReturns x.\n</EXPLANATION>",
+    # Another section's tag inside generated code is literal text
+    "<CODE>\ns = '<EXPLANATION>'\nt = \"</EXPLANATION>\"\n</CODE><EXPLANATION>Tags.</EXPLANATION>",
+    "<CODE>if a < b and b<c:\n    pass</CODE><EXPLANATION>Compares <CODE>a</CODE>.</EXPLANATION>",
+    # A repeated opening tag ends the section, as in clean_output
+    "<CODE>x = 1\n<CODE>y = 2</CODE><EXPLANATION>Two.</EXPLANATION>",
+    "Preamble <EXPLANATION> first </EXPLANATION> then <CODE> y = 1 </CODE> end",
+    "<CODE>a  \n\n  b</CODE>",
+]
+
+
+def _stream(text, chunk_size):
+    parser = StreamingOutputParser()
+    streamed = {"code": "", "explanation": ""}
+    for start in range(0, len(text), chunk_size):
+        for section, delta in parser.feed(text[start:start + chunk_size]):
+            streamed[section] += delta
+    return streamed
+
+
+@pytest.mark.parametrize("text", OUTPUTS)
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1000])
+def test_stream_matches_clean_output(text, chunk_size):
+    assert _stream(text, chunk_size) == clean_output(text)
@@ -0,0 +1,12 @@
+import os
+from pathlib import Path
+
+
+def write_atomic(path: Path, write):
+    """
+    Calls write(tmp_path) and then renames the temporary file over path,
+    so readers never see a partially written file.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    write(tmp_path)
+    os.replace(tmp_path, path)
@@ -1,15 +1,316 @@
+import argparse
+import atexit
+import gzip
 import json
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
-LOG_DIR = Path("logs")
-LOG_DIR.mkdir(exist_ok=True)
+try:
+    import fcntl
+except ImportError:  # non-POSIX: no advisory file locks
+    fcntl = None
 
-def log_run(data: dict):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = LOG_DIR / f"run_{timestamp}.json"
+LOG_DIR = Path(os.getenv("RUN_LOG_DIR", "logs"))
+ACTIVE_LOG = "runs.jsonl"
+LOCK_FILE = "runs.lock"
 
-    with open(log_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+# Rotate the active file past this size or age; rotated files are gzipped
+MAX_LOG_BYTES = 64 * 1024 * 1024
+MAX_LOG_AGE_S = 24 * 3600
 
-    return str(log_file)
+
+class RunLogger:
+    """
+    Append-only JSONL run log with a background writer thread.
+
+    log() only enqueues, so callers (API requests) never wait on disk.
+    The writer buffers records, appends them to runs.jsonl every
+    flush_interval_s, and rotates the file by size / age into
+    runs-<timestamp>-<n>.jsonl.gz. The file's age counts from its first
+    record. If the queue is full, records are dropped (and counted)
+    rather than blocking the caller.
+
+    Several processes (e.g. uvicorn workers) can share a log directory:
+    each append and rotation holds an flock on runs.lock, and a writer
+    reopens runs.jsonl once another process has rotated it. Without
+    fcntl (non-POSIX) there is no lock, so use one writer process per
+    log directory there.
+    """
+
+    def __init__(
+        self,
+        log_dir=LOG_DIR,
+        max_bytes=MAX_LOG_BYTES,
+        max_age_s=MAX_LOG_AGE_S,
+        flush_interval_s=1.0,
+        max_queue=10000,
+    ):
+        self.log_dir = Path(log_dir)
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.flush_interval_s = flush_interval_s
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._inode = None
+        self._started_at = None
+        self._lock_file = None
+        self._closed = False
+        self.stats = {"written": 0, "dropped": 0, "rotations": 0}
+
+        self._thread = threading.Thread(target=self._run, name="run-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def path(self) -> Path:
+        return self.log_dir / ACTIVE_LOG
+
+    def log(self, data: dict) -> str:
+        """
+        Queues one run record and returns its run id.
+        """
+        run_id = uuid.uuid4().hex
+        record = {"run_id": run_id, "ts": time.time(), **data}
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.stats["dropped"] += 1
+        return run_id
+
+    def flush(self, timeout_s=5.0):
+        """
+        Blocks until everything queued so far is on disk.
+        """
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout_s)
+        except queue.Full:
+            return False
+        return done.wait(timeout_s)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    # ---- writer thread ----
+
+    def _open(self):
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._started_at = self._first_ts()
+
+    def _first_ts(self):
+        """
+        ts of the active file's first record (None while it is empty), so
+        restarts and other writers agree on when the file was started.
+        """
+        with open(self.path, encoding="utf-8") as f:
+            line = f.readline()
+        if not line:
+            return None
+        try:
+            return float(json.loads(line)["ts"])
+        except (ValueError, KeyError, TypeError):
+            return time.time()
+
+    def _ensure_open(self):
+        if self._file is not None:
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == self._inode:
+                return
+            # Rotated by another writer since we opened it
+            self._file.close()
+        self._open()
+
+    @contextmanager
+    def _locked(self):
+        if fcntl is None:
+            yield
+            return
+        if self._lock_file is None:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            self._lock_file = open(self.log_dir / LOCK_FILE, "a")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _should_rotate(self):
+        if self._started_at is None:
+            self._started_at = self._first_ts()
+        return (
+            os.fstat(self._file.fileno()).st_size >= self.max_bytes
+            or (self._started_at is not None and time.time() - self._started_at >= self.max_age_s)
+        )
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        n = 0
+        while (self.log_dir / f"runs-{stamp}-{n:03d}.jsonl.gz").exists():
+            n += 1
+        target = self.log_dir / f"runs-{stamp}-{n:03d}.jsonl.gz"
+
+        staging = self.path.with_name(ACTIVE_LOG + ".rotating")
+        os.replace(self.path, staging)
+        with open(staging, "rb") as src, gzip.open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        staging.unlink()
+
+        self.stats["rotations"] += 1
+
+    def _write(self, lines):
+        """
+        Appends buffered lines and rotates if due, under the directory lock.
+        """
+        if not lines and self._file is None:
+            return
+        with self._locked():
+            self._ensure_open()
+            if lines:
+                self._file.write("".join(lines))
+                self._file.flush()
+            if self._should_rotate():
+                self._rotate()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        buffer = []
+        stop = False
+
+        while not stop:
+            try:
+                item = self._queue.get(timeout=self.flush_interval_s)
+            except queue.Empty:
+                item = False  # timer tick
+
+            events = []
+            # Drain whatever else is already queued into the buffer
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                elif item is not False:
+                    buffer.append(json.dumps(item, default=str) + "\n")
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            now = time.monotonic()
+            if events or stop or now - last_flush >= self.flush_interval_s:
+                try:
+                    self._write(buffer)
+                    self.stats["written"] += len(buffer)
+                except OSError as e:
+                    # Never let a disk problem kill the writer
+                    self.stats["dropped"] += len(buffer)
+                    print(f"[RUN LOG ERROR] {e}")
+                buffer = []
+                last_flush = now
+
+            for event in events:
+                event.set()
+
+        if self._file is not None:
+            self._file.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+
+
+_default_logger = None
+_default_lock = threading.Lock()
+
+
+def get_run_logger() -> RunLogger:
+    global _default_logger
+    with _default_lock:
+        if _default_logger is None:
+            _default_logger = RunLogger()
+        return _default_logger
+
+
+def close_run_logger():
+    """
+    Flushes and stops the shared run logger, if one was started.
+    """
+    global _default_logger
+    with _default_lock:
+        if _default_logger is not None:
+            _default_logger.close()
+            _default_logger = None
+
+
+def log_run(data: dict) -> str:
+    """
+    Appends a run to the shared run log (non-blocking); returns the run id.
+    """
+    return get_run_logger().log(data)
+
+
+def read_runs(log_dir=LOG_DIR, since: float = None):
+    """
+    Yields logged runs oldest first: rotated .jsonl.gz files, then the
+    active file. A partially written last line is skipped.
+    """
+    log_dir = Path(log_dir)
+    # Rotated names sort chronologically by timestamp
+    paths = sorted(log_dir.glob("runs-*.jsonl.gz"))
+    if (log_dir / ACTIVE_LOG).exists():
+        paths.append(log_dir / ACTIVE_LOG)
+
+    for path in paths:
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if since is None or record.get("ts", 0) >= since:
+                    yield record
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the run log")
+    parser.add_argument("--log-dir", default=str(LOG_DIR))
+    parser.add_argument("--hours", type=float, help="Only runs from the last N hours")
+    parser.add_argument("--field", action="append", default=None,
+                        help="Field to count values of (repeatable; default: endpoint, intent, review_status)")
+    args = parser.parse_args()
+
+    since = time.time() - args.hours * 3600 if args.hours else None
+    fields = args.field or ["endpoint", "intent", "review_status"]
+    counts = {field: Counter() for field in fields}
+    total = 0
+
+    for run in read_runs(args.log_dir, since=since):
+        total += 1
+        for field in fields:
+            counts[field][str(run.get(field))] += 1
+
+    print(f"{total} runs")
+    for field, counter in counts.items():
+        print(f"\n{field}:")
+        for value, count in counter.most_common():
+            print(f"  {value:<30} {count}")
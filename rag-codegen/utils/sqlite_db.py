@@ -0,0 +1,20 @@
+import sqlite3
+from pathlib import Path
+
+# How long a writer waits for another process's lock before "database is locked"
+BUSY_TIMEOUT_S = 30.0
+
+
+def connect(path: str, timeout_s: float = BUSY_TIMEOUT_S) -> sqlite3.Connection:
+    """
+    Opens a SQLite cache shared by threads and processes on one host.
+
+    WAL lets readers proceed while another process writes, and the busy
+    timeout makes concurrent writers wait instead of failing.
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path, timeout=timeout_s, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    # Durable enough for a cache, without an fsync on every commit
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
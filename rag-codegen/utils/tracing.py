@@ -0,0 +1,230 @@
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# TRACING=0 turns every span / counter into a no-op
+ENABLED = os.getenv("TRACING", "1").lower() not in ("0", "false", "off")
+
+# Prometheus default latency buckets (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Per-request stage timings (ms), set by trace()
+_current_timings = contextvars.ContextVar("trace_timings", default=None)
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{v}"' for k, v in labels)
+    return "{" + inner + "}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_name, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_name = label_name
+        self.buckets = buckets
+        self._series = {}  # label value -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, label, seconds):
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += seconds
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label, series in sorted(self._series.items()):
+                base = [(self.label_name, label)]
+                for bound, count in zip(self.buckets, series):
+                    lines.append(
+                        f"{self.name}_bucket{_label_text(base + [('le', bound)])} {count}"
+                    )
+                lines.append(f"{self.name}_bucket{_label_text(base + [('le', '+Inf')])} {series[-2]}")
+                lines.append(f"{self.name}_count{_label_text(base)} {series[-2]}")
+                lines.append(f"{self.name}_sum{_label_text(base)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}  # sorted label tuple -> value
+        self._lock = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        if not ENABLED:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(key)} {value}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds", "Latency of pipeline / review stages", "stage"
+)
+REQUEST_SECONDS = Histogram(
+    "rag_request_duration_seconds", "End-to-end API request latency", "endpoint"
+)
+TTFT_SECONDS = Histogram(
+    "rag_llm_ttft_seconds", "Time to first streamed token", "endpoint"
+)
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+# key -> callable returning [(name, type, help, {label: value} | None, value)], read at scrape time
+_collectors = {}
+_collectors_lock = threading.Lock()
+
+
+def counter(name, help_text=""):
+    """
+    Returns the counter registered under name, creating it on first use.
+    """
+    with _counters_lock:
+        if name not in _counters:
+            _counters[name] = Counter(name, help_text)
+        return _counters[name]
+
+
+def register_collector(key, collect):
+    """
+    Registers a callable whose samples (e.g. cache or pool stats kept
+    elsewhere) are read when /metrics is scraped. One collector per key:
+    a newer instance of the same component replaces the older one, so
+    each series is exported once per process.
+    """
+    with _collectors_lock:
+        _collectors[key] = collect
+
+
+@contextmanager
+def _span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(name, elapsed)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings[name] = round(timings.get(name, 0.0) + elapsed * 1000, 2)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name):
+    """
+    Times a stage into rag_stage_duration_seconds and, inside trace(),
+    into the request's timings. A shared no-op when tracing is off.
+    """
+    if not ENABLED:
+        return _NOOP
+    return _span(name)
+
+
+def traced(name):
+    """
+    Decorator form of span(). With tracing off the function is returned
+    undecorated, so there is no per-call overhead at all.
+    """
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def trace(endpoint):
+    """
+    Collects per-stage timings (ms) for one request. Yields the timings
+    dict, which also gets "total" when the request finishes.
+
+    Spans in asyncio.to_thread calls land here too (context is copied).
+    """
+    timings = {}
+    if not ENABLED:
+        yield timings
+        return
+
+    token = _current_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        elapsed = time.perf_counter() - start
+        _current_timings.reset(token)
+        timings["total"] = round(elapsed * 1000, 2)
+        REQUEST_SECONDS.observe(endpoint, elapsed)
+
+
+def observe_ttft(endpoint, seconds):
+    if ENABLED:
+        TTFT_SECONDS.observe(endpoint, seconds)
+
+
+def render_metrics():
+    """
+    Returns all metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for histogram in (STAGE_SECONDS, REQUEST_SECONDS, TTFT_SECONDS):
+        lines.extend(histogram.render())
+
+    with _counters_lock:
+        counters = list(_counters.values())
+    for c in counters:
+        lines.extend(c.render())
+
+    with _collectors_lock:
+        collectors = list(_collectors.values())
+
+    collected = {}
+    for collect in collectors:
+        for name, metric_type, help_text, labels, value in collect():
+            collected.setdefault(name, (metric_type, help_text, []))[2].append((labels, value))
+
+    for name, (metric_type, help_text, samples) in collected.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in samples:
+            lines.append(f"{name}{_label_text(sorted((labels or {}).items()))} {value}")
+
+    return "\n".join(lines) + "\n"
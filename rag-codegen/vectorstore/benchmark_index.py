@@ -0,0 +1,225 @@
+"""
+Recall / latency / memory benchmark for the FAISSIndex backends.
+
+Runs offline on synthetic clustered vectors (or the vectors of an
+existing flat index) and compares each index type against the exact
+flat baseline. Storage options (float16 / sq8 / pq, optionally with
+exact re-ranking) report memory saved and recall lost vs float32.
+Every variant is also searched with a language filter, the way
+RAGPipeline queries it, and reports filtered recall / latency:
+
+    python -m vectorstore.benchmark_index --n 200000 --types flat,ivf,hnsw,ivfpq
+    python -m vectorstore.benchmark_index --types ivf,hnsw --storage float32,float16,sq8,pq --rerank 4
+"""
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from vectorstore.faiss_index import (
+    FAISSIndex,
+    INDEX_PARAMS,
+    METRICS,
+    PQ_PARAMS,
+    STORAGE_TYPES,
+    VECTOR_PARAMS,
+)
+
+# Alternating chunk languages; filtered searches keep FILTER_LANGUAGE
+FILTER_DOCS = [{"text": "", "language": "python"}, {"text": "", "language": "java"}]
+FILTER_LANGUAGE = "python"
+
+
+def synthetic_vectors(n, dim, n_clusters=256, seed=0):
+    """
+    Gaussian clusters, closer to real embedding distributions than
+    uniform noise (which makes every ANN index look bad).
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype("float32")
+    labels = rng.integers(0, n_clusters, size=n)
+    vectors = centers[labels] + 0.3 * rng.normal(size=(n, dim)).astype("float32")
+    return vectors.astype("float32")
+
+
+def vectors_from_index(path):
+    index = FAISSIndex.load(path, mmap=False)
+    ids = np.array(sorted(index.documents), dtype="int64")
+    if index.exact is not None:
+        # Quantized indexes only reconstruct approximations
+        return index.exact.get(ids)
+    return np.vstack([index.index.reconstruct(int(i)) for i in ids]).astype("float32")
+
+
+def _percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def _search(index, queries, k, ground_truth, language=None):
+    latencies = []
+    found = []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search_ids(q[None, :], k, language=language)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+
+    recall = np.mean([
+        len(set(f.tolist()) & set(gt.tolist())) / k
+        for f, gt in zip(found, ground_truth)
+    ])
+    return round(float(recall), 4), latencies
+
+
+def benchmark(index, queries, k, ground_truth, filtered_ground_truth):
+    recall, latencies = _search(index, queries, k, ground_truth)
+    filtered_recall, filtered_latencies = _search(
+        index, queries, k, filtered_ground_truth, language=FILTER_LANGUAGE
+    )
+
+    result = {
+        "recall_at_k": recall,
+        "p50_ms": _percentile_ms(latencies, 50),
+        "p99_ms": _percentile_ms(latencies, 99),
+        "filtered_recall_at_k": filtered_recall,
+        "filtered_p50_ms": _percentile_ms(filtered_latencies, 50),
+        # Resident: codes plus index structure, excluding vectors.npy
+        "bytes_per_vector": round(
+            faiss.serialize_index(index.index).size / index.index.ntotal, 1
+        ),
+    }
+    if index.exact is not None:
+        # Re-rank copies live on disk and are paged in per shortlist
+        result["disk_bytes_per_vector"] = index.dim * 4 + 8
+    return result
+
+
+def _variants(index_types, storages, rerank):
+    for index_type in index_types:
+        # ivfpq always stores PQ codes; flat cannot (no filtered IndexPQ search)
+        type_storages = ["pq"] if index_type == "ivfpq" else storages
+        for storage in type_storages:
+            if index_type == "flat" and storage == "pq":
+                print(f"{'flat/pq':>24}  skipped (use ivf / hnsw / ivfpq for pq)")
+                continue
+            yield index_type, storage, 0
+            if rerank and storage != "float32":
+                yield index_type, storage, rerank
+
+
+def run(vectors, index_types, k, n_queries, params, storages=("float32",), metric="l2",
+        rerank=0, seed=0):
+    rng = np.random.default_rng(seed)
+    query_ids = rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+    # Perturb so queries are not exact copies of indexed vectors
+    queries = vectors[query_ids] + 0.05 * rng.normal(size=(len(query_ids), vectors.shape[1]))
+    queries = queries.astype("float32")
+
+    dim = vectors.shape[1]
+    docs = [FILTER_DOCS[i % len(FILTER_DOCS)] for i in range(len(vectors))]
+
+    baseline = FAISSIndex(dim, "flat", metric=metric)
+    baseline.add(vectors, docs)
+    _, ground_truth = baseline.search_ids(queries, k)
+    _, filtered_ground_truth = baseline.search_ids(queries, k, language=FILTER_LANGUAGE)
+    del baseline
+
+    report = {}
+    for index_type, storage, rerank_k in _variants(index_types, storages, rerank):
+        allowed = {**VECTOR_PARAMS, **INDEX_PARAMS[index_type], **PQ_PARAMS}
+        type_params = {
+            name: value for name, value in params.items()
+            if name in allowed and value is not None
+        }
+        index = FAISSIndex(dim, index_type, metric=metric, storage=storage,
+                           rerank=rerank_k, **type_params)
+
+        start = time.perf_counter()
+        index.add(vectors, docs)
+        build_s = time.perf_counter() - start
+
+        result = benchmark(index, queries, k, ground_truth, filtered_ground_truth)
+        result["build_s"] = round(build_s, 2)
+        result["params"] = index.params
+
+        # Savings and recall loss relative to float32 storage of the same type
+        label = f"{index_type}/{storage}" + (f"+rerank{rerank_k}" if rerank_k else "")
+        reference = report.get(f"{'ivf' if index_type == 'ivfpq' else index_type}/float32")
+        if reference is not None:
+            result["memory_saving_pct"] = round(
+                100 * (1 - result["bytes_per_vector"] / reference["bytes_per_vector"]), 1
+            )
+            result["recall_loss"] = round(reference["recall_at_k"] - result["recall_at_k"], 4)
+        report[label] = result
+
+        extra = ""
+        if "memory_saving_pct" in result:
+            extra = f"  saves {result['memory_saving_pct']}%  recall -{result['recall_loss']}"
+        print(
+            f"{label:>24}  recall@{k}={result['recall_at_k']:.3f}  "
+            f"p50={result['p50_ms']}ms  p99={result['p99_ms']}ms  "
+            f"filtered recall={result['filtered_recall_at_k']:.3f} "
+            f"p50={result['filtered_p50_ms']}ms  "
+            f"{result['bytes_per_vector']} B/vec  build={result['build_s']}s{extra}"
+        )
+        del index
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark FAISSIndex backends")
+    parser.add_argument("--n", type=int, default=100000, help="Synthetic vectors")
+    parser.add_argument("--dim", type=int, default=384, help="Vector dimension")
+    parser.add_argument("--from-index", help="Use vectors from an existing index dir")
+    parser.add_argument("--types", default="flat,ivf,hnsw,ivfpq")
+    parser.add_argument("--storage", default="float32",
+                        help=f"Comma-separated storage options: {', '.join(STORAGE_TYPES)}")
+    parser.add_argument("--metric", choices=list(METRICS), default="l2")
+    parser.add_argument("--rerank", type=int, default=0,
+                        help="Also run each quantized storage with exact re-ranking of top_k * N")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--nlist", type=int)
+    parser.add_argument("--nprobe", type=int)
+    parser.add_argument("--hnsw-m", type=int)
+    parser.add_argument("--ef-search", type=int)
+    parser.add_argument("--pq-m", type=int)
+    parser.add_argument("--pq-nbits", type=int)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    if args.from_index:
+        vectors = vectors_from_index(args.from_index)
+    else:
+        vectors = synthetic_vectors(args.n, args.dim)
+
+    report = run(
+        vectors,
+        index_types=args.types.split(","),
+        k=args.k,
+        n_queries=args.queries,
+        params={
+            "nlist": args.nlist,
+            "nprobe": args.nprobe,
+            "hnsw_m": args.hnsw_m,
+            "ef_search": args.ef_search,
+            "pq_m": args.pq_m,
+            "pq_nbits": args.pq_nbits,
+        },
+        storages=args.storage.split(","),
+        metric=args.metric,
+        rerank=args.rerank,
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "n": len(vectors),
+                "dim": vectors.shape[1],
+                "k": args.k,
+                "metric": args.metric,
+                "results": report,
+            }, f, indent=2)
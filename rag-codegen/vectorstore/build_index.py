@@ -1,27 +1,330 @@
-import pickle
-from ingestion.loader import load_code_files
-from ingestion.chunker import chunk_code
+import argparse
+import time
+
+import numpy as np
+
 from ingestion.embedder import Embedder
-from vectorstore.faiss_index import FAISSIndex
+from ingestion.pipeline import iter_documents, iter_chunk_batches, prefetch
+from ingestion.sharded_embedder import ShardedEmbedder
+from vectorstore.faiss_index import (
+    FAISSIndex,
+    IndexFormatError,
+    DEFAULT_INDEX_DIR,
+    INDEX_PARAMS,
+    PQ_PARAMS,
+    STORAGE_TYPES,
+    VECTOR_PARAMS,
+    load_manifest,
+)
+from vectorstore.lexical_index import BM25Index
+
+# Vectors buffered to train IVF / PQ / SQ codebooks before the first add
+TRAIN_POINTS_PER_LIST = 40
+MAX_TRAIN_SIZE = 100000
+
+
+class _IndexWriter:
+    """
+    Appends embedded chunk batches to the index, recording the
+    assigned chunk ids per source file in the manifest.
+
+    For index types that need training, the first batches are buffered
+    until a training sample is available.
+    """
+
+    def __init__(self, files, index=None, index_type="flat", index_params=None,
+                 progress_every=10, workers=1):
+        self.files = files
+        self.index = index
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self.progress_every = progress_every
+        self.workers = workers
+
+        self._pending = []
+        self.batches = 0
+        self.chunks = 0
+        self.start = time.perf_counter()
+
+    def _train_size(self):
+        return min(self.index.train_centroids() * TRAIN_POINTS_PER_LIST, MAX_TRAIN_SIZE)
+
+    def add_batch(self, chunks, vectors):
+        if self.index is None:
+            self.index = FAISSIndex(
+                dim=vectors.shape[1],
+                index_type=self.index_type,
+                **self.index_params
+            )
+
+        if self.index.index.is_trained:
+            self._add(vectors, chunks)
+        else:
+            self._pending.append((vectors, chunks))
+            if sum(len(c) for _, c in self._pending) >= self._train_size():
+                self._flush_pending()
+
+        self.batches += 1
+        if self.progress_every and self.batches % self.progress_every == 0:
+            self.report()
+
+    def finish(self):
+        if self._pending:
+            self._flush_pending()
+        self.report()
+        return self.index
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        rate = self.chunks / elapsed if elapsed > 0 else 0.0
+        print(
+            f"[ingest] {len(self.files)} files, {self.chunks} chunks embedded "
+            f"({rate:.1f} chunks/s, {elapsed:.1f}s, {self.workers} workers)",
+            flush=True
+        )
+
+    def _flush_pending(self):
+        self.index.train(np.vstack([v for v, _ in self._pending]))
+        for vectors, chunks in self._pending:
+            self._add(vectors, chunks)
+        self._pending = []
+
+    def _add(self, vectors, chunks):
+        ids = self.index.add(vectors, chunks)
+        for chunk, chunk_id in zip(chunks, ids):
+            self.files[chunk["source"]]["chunk_ids"].append(chunk_id)
+        self.chunks += len(chunks)
+
+
+def _embed_batches(batches, workers=1, threads_per_worker=None):
+    """
+    Yields (chunks, vectors) in batch order, embedding in-process or
+    sharded across worker processes when workers > 1.
+    """
+    if workers <= 1:
+        embedder = Embedder()
+        for chunks in batches:
+            yield chunks, embedder.embed([c["text"] for c in chunks])
+        return
+
+    embedder = ShardedEmbedder(workers, threads_per_worker=threads_per_worker)
+    try:
+        yield from embedder.embed_batches(batches)
+    finally:
+        embedder.close()
 
-def build_and_save_index():
-    embedder = Embedder()
-    documents = load_code_files()
 
-    chunks = []
+def _register(documents, files):
+    """
+    Records each streamed file in the manifest before its chunks are embedded.
+    """
     for doc in documents:
-        chunks.extend(chunk_code(doc))
+        files[doc["source"]] = {"hash": doc["hash"], "chunk_ids": []}
+        yield doc
 
-    texts = [c["text"] for c in chunks]
-    embeddings = embedder.embed(texts)
 
-    index = FAISSIndex(dim=embeddings.shape[1])
-    index.add(embeddings, chunks)
+def _save(index, index_dir, files, compress_text=None):
+    # Lexical index first: meta.json (written by index.save) marks completion
+    BM25Index.build(index.documents).save(index_dir)
+    index.save(index_dir, manifest={"files": files}, compress_text=compress_text)
 
-    with open("vectorstore/faiss_store.pkl", "wb") as f:
-        pickle.dump(index, f)
 
-    print("FAISS index built and saved.")
+def build_and_save_index(
+    index_dir=DEFAULT_INDEX_DIR,
+    index_type="flat",
+    index_params=None,
+    corpus_dir="corpus",
+    batch_size=256,
+    read_workers=4,
+    workers=1,
+    threads_per_worker=None,
+    compress_text=False,
+):
+    """
+    Streams the corpus through read -> chunk -> embed -> add in
+    fixed-size batches, so peak memory does not grow with corpus size.
+
+    With workers > 1, embedding is sharded across that many processes.
+    compress_text zlib-compresses the stored chunk texts.
+    """
+    files = {}
+    documents = _register(iter_documents(corpus_dir, read_workers=read_workers), files)
+    batches = prefetch(iter_chunk_batches(documents, batch_size=batch_size))
+
+    writer = _IndexWriter(files, index_type=index_type, index_params=index_params,
+                          workers=workers)
+    for chunks, vectors in _embed_batches(batches, workers, threads_per_worker):
+        writer.add_batch(chunks, vectors)
+    index = writer.finish()
+
+    if index is None:
+        print("No chunks found in corpus; nothing to index.")
+        return
+
+    _save(index, index_dir, files, compress_text)
+
+    print(f"FAISS '{index.index_type}' index built and saved to {index_dir}.")
+
+
+def update_index(
+    index_dir=DEFAULT_INDEX_DIR,
+    corpus_dir="corpus",
+    batch_size=256,
+    read_workers=4,
+    workers=1,
+    threads_per_worker=None,
+    index_type="flat",
+    index_params=None,
+    compress_text=False,
+):
+    """
+    Incrementally updates an existing index: only added or changed
+    files are re-embedded, and vectors of deleted files are removed.
+
+    Falls back to a full build with index_type / index_params /
+    compress_text when no usable index exists; an existing index keeps
+    its own settings.
+    """
+    manifest = load_manifest(index_dir)
+    try:
+        index = FAISSIndex.load(index_dir, mmap=False)
+    except IndexFormatError:
+        index = None
+
+    if index is None or manifest is None:
+        print("No existing index/manifest; running full build.")
+        build_and_save_index(index_dir, index_type, index_params, corpus_dir,
+                             batch_size, read_workers, workers, threads_per_worker,
+                             compress_text=compress_text)
+        return
+
+    known = manifest["files"]
+    seen = set()
+    changed = []
+
+    def changed_documents():
+        # Runs in the prefetch thread; only reads `known`
+        for doc in iter_documents(corpus_dir, read_workers=read_workers):
+            seen.add(doc["source"])
+            entry = known.get(doc["source"])
+            if entry is None or entry["hash"] != doc["hash"]:
+                changed.append(doc["source"])
+                yield doc
+
+    if not index.supports_removal:
+        # Hash-only pass: any change means a full rebuild for this index type
+        if any(True for _ in changed_documents()) or set(known) - seen:
+            print(f"'{index.index_type}' index cannot remove vectors; running full build.")
+            build_and_save_index(index_dir, index.index_type, index.params, corpus_dir,
+                                 batch_size, read_workers, workers, threads_per_worker,
+                                 compress_text=index.documents.compress)
+        else:
+            print("Index up to date.")
+        return
+
+    files = {}
+    writer = _IndexWriter(files, index=index, workers=workers)
+    documents = _register(changed_documents(), files)
+    batches = prefetch(iter_chunk_batches(documents, batch_size=batch_size))
+    for chunks, vectors in _embed_batches(batches, workers, threads_per_worker):
+        writer.add_batch(chunks, vectors)
+    writer.finish()
+
+    # Drop stale vectors for changed and deleted files
+    deleted = [source for source in known if source not in seen]
+    stale_ids = []
+    for source in deleted + changed:
+        entry = known.pop(source, None)
+        if entry:
+            stale_ids.extend(entry["chunk_ids"])
+    index.remove(stale_ids)
+
+    known.update(files)
+    _save(index, index_dir, known)
+
+    print(
+        f"Index updated: {len(changed)} files re-embedded, "
+        f"{len(deleted)} files removed, {len(stale_ids)} stale chunks dropped."
+    )
+
 
 if __name__ == "__main__":
-    build_and_save_index()
+    parser = argparse.ArgumentParser(description="Build the FAISS code index")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-embed added/changed files and drop deleted ones",
+    )
+    parser.add_argument(
+        "--index-type",
+        choices=list(INDEX_PARAMS),
+        default="flat",
+        help="FAISS index type for full builds (incremental keeps an existing index's type)",
+    )
+    parser.add_argument("--nlist", type=int, help="IVF clusters")
+    parser.add_argument("--nprobe", type=int, help="IVF clusters probed per query")
+    parser.add_argument("--hnsw-m", type=int, help="HNSW graph degree")
+    parser.add_argument("--ef-construction", type=int, help="HNSW build candidate list size")
+    parser.add_argument("--ef-search", type=int, help="HNSW search candidate list size")
+    parser.add_argument("--pq-m", type=int, help="PQ sub-vectors (must divide the dimension)")
+    parser.add_argument("--pq-nbits", type=int, help="PQ bits per sub-vector code")
+    parser.add_argument("--metric", choices=["l2", "cosine"], help="Distance (default l2)")
+    parser.add_argument(
+        "--storage",
+        choices=STORAGE_TYPES,
+        help="Vector coding in RAM (default float32; ivfpq is always pq, flat cannot use pq)",
+    )
+    parser.add_argument(
+        "--rerank",
+        type=int,
+        help="Keep full-precision vectors on disk and re-rank top_k * N candidates exactly",
+    )
+    parser.add_argument("--corpus", default="corpus", help="Corpus root directory")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per embedding batch")
+    parser.add_argument("--read-workers", type=int, default=4, help="Parallel file readers")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Embedding worker processes, each with its own model copy",
+    )
+    parser.add_argument(
+        "--threads-per-worker",
+        type=int,
+        help="Intra-op threads per embedding worker (default: cores / workers)",
+    )
+    parser.add_argument(
+        "--compress-text",
+        action="store_true",
+        help="zlib-compress stored chunk texts (full builds; incremental keeps an existing index's setting)",
+    )
+    args = parser.parse_args()
+
+    index_params = {
+        name: getattr(args, name)
+        for name in {**VECTOR_PARAMS, **INDEX_PARAMS[args.index_type], **PQ_PARAMS}
+        if getattr(args, name) is not None
+    }
+
+    if args.incremental:
+        update_index(
+            corpus_dir=args.corpus,
+            batch_size=args.batch_size,
+            read_workers=args.read_workers,
+            workers=args.workers,
+            threads_per_worker=args.threads_per_worker,
+            index_type=args.index_type,
+            index_params=index_params,
+            compress_text=args.compress_text,
+        )
+    else:
+        build_and_save_index(
+            index_type=args.index_type,
+            index_params=index_params,
+            corpus_dir=args.corpus,
+            batch_size=args.batch_size,
+            read_workers=args.read_workers,
+            workers=args.workers,
+            threads_per_worker=args.threads_per_worker,
+            compress_text=args.compress_text,
+        )
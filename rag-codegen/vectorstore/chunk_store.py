@@ -0,0 +1,250 @@
+import json
+import zlib
+from collections.abc import Mapping
+from pathlib import Path
+
+import numpy as np
+
+from utils.fileio import write_atomic
+
+# On-disk layout (inside the index directory):
+#   chunks.bin   text blob: each chunk's text (zlib-compressed when enabled)
+#                followed by its symbol name
+#   chunks.npy   one fixed-size row per chunk (ROW_DTYPE), sorted by id
+#   chunks.json  compression flag and the language / category / source
+#                vocabularies the row codes point into
+BLOB_FILE = "chunks.bin"
+ROWS_FILE = "chunks.npy"
+VOCAB_FILE = "chunks.json"
+
+ROW_DTYPE = np.dtype([
+    ("id", "<i8"),
+    ("offset", "<i8"),        # text start in the blob
+    ("length", "<i4"),        # stored (possibly compressed) text bytes
+    ("symbol_length", "<i4"), # symbol bytes right after the text; -1 = None
+    ("language", "<i4"),      # vocabulary codes; -1 = None
+    ("category", "<i4"),
+    ("source", "<i4"),
+    ("start_line", "<i4"),    # -1 = None
+    ("end_line", "<i4"),
+    ("tokens", "<i4"),
+])
+
+CODED_FIELDS = ["language", "category", "source"]
+INT_FIELDS = ["start_line", "end_line", "tokens"]
+STORED_FIELDS = CODED_FIELDS + INT_FIELDS + ["symbol"]
+
+
+class ChunkStore(Mapping):
+    """
+    Read-mostly chunk metadata, keyed by chunk id.
+
+    Stored chunks live in flat arrays: a fixed-size row per chunk
+    (offsets, int-coded language / category / source, line numbers) and
+    one byte blob for the texts, both memory-mapped when loaded. Text is
+    only decoded when a chunk is looked up, so a serving worker pays for
+    the top-k hits it returns rather than for the whole corpus.
+
+    Chunks added after loading are held in memory and removals are
+    tombstoned until the next save() writes a compacted store.
+    """
+
+    def __init__(self, compress=False):
+        self.compress = compress
+        self._rows = np.zeros(0, dtype=ROW_DTYPE)
+        self._blob = b""
+        self._vocab = {field: [] for field in CODED_FIELDS}
+        self._live = None   # row mask, created on first removal
+        self._added = {}    # chunk id -> document, not yet saved
+
+    # ---- Mapping ----
+
+    def _row(self, chunk_id):
+        ids = self._rows["id"]
+        row = int(np.searchsorted(ids, chunk_id))
+        if row < len(ids) and ids[row] == chunk_id and (self._live is None or self._live[row]):
+            return row
+        return None
+
+    def __getitem__(self, chunk_id):
+        doc = self._added.get(chunk_id)
+        if doc is not None:
+            return {"text": doc["text"], **{f: doc.get(f) for f in STORED_FIELDS}}
+        row = self._row(chunk_id)
+        if row is None:
+            raise KeyError(chunk_id)
+        return self._decode(self._rows[row])
+
+    def __contains__(self, chunk_id):
+        return chunk_id in self._added or self._row(chunk_id) is not None
+
+    def __iter__(self):
+        ids = self._rows["id"] if self._live is None else self._rows["id"][self._live]
+        yield from ids.tolist()
+        yield from sorted(self._added)
+
+    def __len__(self):
+        stored = len(self._rows) if self._live is None else int(self._live.sum())
+        return stored + len(self._added)
+
+    def _text(self, row):
+        start, length = int(row["offset"]), int(row["length"])
+        data = bytes(self._blob[start:start + length])
+        return zlib.decompress(data) if self.compress else data
+
+    def _decode(self, row):
+        return {"text": self._text(row).decode("utf-8"), **self._fields(row)}
+
+    def _fields(self, row):
+        """
+        Everything but the text, decoded from the row and vocabularies.
+        """
+        doc = {}
+        for field in CODED_FIELDS:
+            code = int(row[field])
+            doc[field] = self._vocab[field][code] if code >= 0 else None
+        for field in INT_FIELDS:
+            value = int(row[field])
+            doc[field] = value if value >= 0 else None
+
+        symbol_length = int(row["symbol_length"])
+        if symbol_length >= 0:
+            start = int(row["offset"]) + int(row["length"])
+            doc["symbol"] = bytes(self._blob[start:start + symbol_length]).decode("utf-8")
+        else:
+            doc["symbol"] = None
+        return doc
+
+    # ---- updates ----
+
+    def add(self, ids, docs):
+        # Docs are kept by reference; only STORED_FIELDS survive save()
+        for chunk_id, doc in zip(ids, docs):
+            self._added[chunk_id] = doc
+
+    def remove(self, ids):
+        for chunk_id in ids:
+            if self._added.pop(chunk_id, None) is not None:
+                continue
+            row = self._row(chunk_id)
+            if row is not None:
+                if self._live is None:
+                    self._live = np.ones(len(self._rows), dtype=bool)
+                self._live[row] = False
+
+    # ---- filters ----
+
+    def filter_ids(self, language=None, category=None):
+        """
+        Ids of chunks matching the (case-insensitive) language / category,
+        computed on the code columns without touching any text.
+        """
+        mask = np.ones(len(self._rows), dtype=bool) if self._live is None else self._live.copy()
+        wanted = {"language": language, "category": category}
+
+        for field, value in wanted.items():
+            if value is None:
+                continue
+            value = value.lower()
+            codes = [i for i, v in enumerate(self._vocab[field]) if str(v or "").lower() == value]
+            mask &= np.isin(self._rows[field], codes)
+
+        added = [
+            chunk_id for chunk_id, doc in self._added.items()
+            if all(
+                value is None or str(doc.get(field) or "").lower() == value.lower()
+                for field, value in wanted.items()
+            )
+        ]
+        return np.concatenate([
+            self._rows["id"][mask], np.array(sorted(added), dtype="int64")
+        ]).astype("int64")
+
+    # ---- persistence ----
+
+    def _stored_text(self, row, compress):
+        """
+        Raw blob bytes of a stored chunk's text, re-encoded only if the
+        target compression setting differs.
+        """
+        start, length = int(row["offset"]), int(row["length"])
+        data = bytes(self._blob[start:start + length])
+        if compress == self.compress:
+            return data
+        return zlib.compress(data) if compress else zlib.decompress(data)
+
+    def save(self, path, compress=None):
+        """
+        Writes a compacted store: live stored chunks followed by the
+        added ones, in id order. compress overrides the store's setting.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        compress = self.compress if compress is None else compress
+
+        live = self._rows if self._live is None else self._rows[self._live]
+        rows = np.zeros(len(live) + len(self._added), dtype=ROW_DTYPE)
+        vocab = {field: [] for field in CODED_FIELDS}
+        lookup = {field: {} for field in CODED_FIELDS}
+
+        def code(field, value):
+            if value is None:
+                return -1
+            if value not in lookup[field]:
+                lookup[field][value] = len(vocab[field])
+                vocab[field].append(value)
+            return lookup[field][value]
+
+        def entries():
+            for row in live:
+                yield int(row["id"]), self._stored_text(row, compress), self._fields(row)
+            for chunk_id in sorted(self._added):
+                doc = self._added[chunk_id]
+                text = doc["text"].encode("utf-8")
+                yield chunk_id, zlib.compress(text) if compress else text, doc
+
+        def write_blob(p):
+            offset = 0
+            with open(p, "wb") as f:
+                for i, (chunk_id, text, fields) in enumerate(entries()):
+                    symbol = fields.get("symbol")
+                    symbol_bytes = symbol.encode("utf-8") if symbol is not None else b""
+                    f.write(text)
+                    f.write(symbol_bytes)
+
+                    rows[i] = (
+                        chunk_id, offset, len(text),
+                        len(symbol_bytes) if symbol is not None else -1,
+                        *(code(field, fields.get(field)) for field in CODED_FIELDS),
+                        *(-1 if fields.get(field) is None else fields[field] for field in INT_FIELDS),
+                    )
+                    offset += len(text) + len(symbol_bytes)
+
+        def write_rows(p):
+            with open(p, "wb") as f:
+                np.save(f, rows)
+
+        write_atomic(path / BLOB_FILE, write_blob)
+        write_atomic(path / ROWS_FILE, write_rows)
+        write_atomic(
+            path / VOCAB_FILE,
+            lambda p: p.write_text(json.dumps({"compress": compress, **vocab}), encoding="utf-8")
+        )
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        path = Path(path)
+        vocab = json.loads((path / VOCAB_FILE).read_text(encoding="utf-8"))
+
+        store = cls(compress=vocab["compress"])
+        store._vocab = {field: vocab[field] for field in CODED_FIELDS}
+
+        mode = "r" if mmap else None
+        store._rows = np.load(path / ROWS_FILE, mmap_mode=mode, allow_pickle=False)
+
+        blob_path = path / BLOB_FILE
+        if mmap and blob_path.stat().st_size:
+            store._blob = np.memmap(blob_path, dtype="uint8", mode="r")
+        else:
+            store._blob = blob_path.read_bytes()
+        return store
@@ -0,0 +1,96 @@
+from pathlib import Path
+
+import numpy as np
+
+from utils.fileio import write_atomic
+
+# Full-precision vectors kept next to a compressed index:
+#   vectors.npy      float32 rows, sorted by chunk id
+#   vector_ids.npy   the chunk id of each row
+VECTORS_FILE = "vectors.npy"
+VECTOR_IDS_FILE = "vector_ids.npy"
+
+WRITE_ROWS = 65536
+
+
+class ExactVectors:
+    """
+    Full-precision copies of the indexed vectors, used to re-rank a
+    shortlist from a float16 / SQ8 / PQ index exactly.
+
+    Rows are memory-mapped when loaded, so a query only pages in the
+    rows it re-ranks and RAM holds just the compressed codes. Vectors
+    added since loading are kept in memory until save().
+    """
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.ids = np.zeros(0, dtype="int64")
+        self.vectors = np.zeros((0, dim), dtype="float32")
+        self._pending = []
+
+    def __len__(self):
+        return len(self.ids) + sum(len(ids) for ids, _ in self._pending)
+
+    def add(self, ids, vectors):
+        self._pending.append((np.asarray(ids, dtype="int64"), np.asarray(vectors, dtype="float32")))
+
+    def _consolidate(self):
+        # Chunk ids only grow, so appending keeps the rows sorted
+        if self._pending:
+            self.ids = np.concatenate([self.ids] + [ids for ids, _ in self._pending])
+            self.vectors = np.vstack([self.vectors] + [v for _, v in self._pending])
+            self._pending = []
+
+    def get(self, ids):
+        """
+        Vectors for the given chunk ids (all must be present).
+        """
+        self._consolidate()
+        rows = np.searchsorted(self.ids, ids)
+        return np.asarray(self.vectors[rows], dtype="float32")
+
+    def save(self, path, ids):
+        """
+        Writes the rows of the given (sorted, live) chunk ids, dropping
+        vectors of removed chunks.
+        """
+        self._consolidate()
+        path = Path(path)
+        ids = np.asarray(ids, dtype="int64")
+        rows = np.searchsorted(self.ids, ids)
+
+        def write_vectors(p):
+            out = np.lib.format.open_memmap(p, mode="w+", dtype="float32", shape=(len(ids), self.dim))
+            for start in range(0, len(ids), WRITE_ROWS):
+                out[start:start + WRITE_ROWS] = self.vectors[rows[start:start + WRITE_ROWS]]
+            out.flush()
+            del out
+
+        def write_ids(p):
+            with open(p, "wb") as f:
+                np.save(f, ids)
+
+        write_atomic(path / VECTORS_FILE, write_vectors)
+        write_atomic(path / VECTOR_IDS_FILE, write_ids)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Returns the stored vectors, or None if the index has none.
+        """
+        path = Path(path)
+        if not (path / VECTORS_FILE).exists():
+            return None
+
+        mode = "r" if mmap else None
+        vectors = np.load(path / VECTORS_FILE, mmap_mode=mode, allow_pickle=False)
+        obj = cls(vectors.shape[1])
+        obj.vectors = vectors
+        obj.ids = np.load(path / VECTOR_IDS_FILE, allow_pickle=False)
+        return obj
+
+
+def remove_exact_vectors(path):
+    for name in (VECTORS_FILE, VECTOR_IDS_FILE):
+        (Path(path) / name).unlink(missing_ok=True)
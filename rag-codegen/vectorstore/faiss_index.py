@@ -1,18 +1,443 @@
+import json
+from pathlib import Path
+
 import faiss
 import numpy as np
 
+from utils.fileio import write_atomic
+from vectorstore.chunk_store import ChunkStore
+from vectorstore.exact_vectors import ExactVectors, remove_exact_vectors
+
+# On-disk layout (one directory per index):
+#   index.faiss     native FAISS index, opened with mmap at serve time
+#   chunks.*        chunk texts and metadata (vectorstore/chunk_store.py)
+#   manifest.json   source file hashes -> chunk ids (incremental builds)
+#   lexical.npz     BM25 inverted index (vectorstore/lexical_index.py)
+#   vectors.npy     full-precision vectors for re-ranking (only with rerank)
+#   meta.json       format version, dimension and counts (written last)
+INDEX_FORMAT_VERSION = 3
+DEFAULT_INDEX_DIR = "vectorstore/index"
+
+INDEX_FILE = "index.faiss"
+MANIFEST_FILE = "manifest.json"
+META_FILE = "meta.json"
+
+# Build/search parameters per index type; stored in meta.json with the index.
+#   nlist      IVF coarse clusters (needs training, >= nlist vectors)
+#   nprobe     IVF clusters visited per query (recall vs latency)
+#   hnsw_m     HNSW graph degree
+#   ef_*       HNSW candidate list size at build / search time
+#   pq_m/bits  product-quantizer sub-vectors and bits per code
+INDEX_PARAMS = {
+    "flat": {},
+    "ivf": {"nlist": 1024, "nprobe": 16},
+    "hnsw": {"hnsw_m": 32, "ef_construction": 200, "ef_search": 64},
+    "ivfpq": {"nlist": 1024, "nprobe": 16, "pq_m": 16, "pq_nbits": 8},
+}
+
+# Vector storage options, valid for every index type except flat + pq.
+#   metric     "l2", or "cosine": vectors are L2-normalized and searched by
+#              inner product; "distance" is then 1 - cosine similarity
+#   storage    how vectors are coded in RAM: float32 | float16 | sq8 (8-bit
+#              scalar quantization) | pq (pq_m x pq_nbits product codes);
+#              ivfpq always stores PQ codes
+#   rerank     shortlist multiplier: fetch top_k * rerank candidates from the
+#              coded index and re-rank them exactly against full-precision
+#              vectors kept on disk (vectors.npy); 0 = off
+VECTOR_PARAMS = {"metric": "l2", "storage": "float32", "rerank": 0}
+PQ_PARAMS = {"pq_m": 16, "pq_nbits": 8}
+
+METRICS = {"l2": faiss.METRIC_L2, "cosine": faiss.METRIC_INNER_PRODUCT}
+STORAGE_TYPES = ["float32", "float16", "sq8", "pq"]
+SCALAR_QUANTIZERS = {
+    "float16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+
+class IndexFormatError(Exception):
+    """Raised when an on-disk index is missing or has an unsupported format."""
+    pass
+
+
+def _mmap_flags():
+    # IO_FLAG_MMAP_IFC also maps flat codes; older FAISS builds only map IVF lists
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def _resolve_params(index_type, params):
+    if index_type not in INDEX_PARAMS:
+        raise ValueError(
+            f"Unknown index type '{index_type}' (choose from {', '.join(INDEX_PARAMS)})"
+        )
+
+    resolved = {**VECTOR_PARAMS, **INDEX_PARAMS[index_type], **params}
+    if index_type == "ivfpq":
+        resolved["storage"] = "pq"
+    elif resolved["storage"] == "pq":
+        if index_type == "flat":
+            # IndexPQ rejects ID selectors, so language / category filters would fail
+            raise ValueError(
+                "'flat' index does not support pq storage (filtered search is not "
+                "available on FAISS IndexPQ); use 'ivfpq', or 'ivf' / 'hnsw' with pq storage"
+            )
+        resolved = {**PQ_PARAMS, **resolved}
+
+    if resolved["metric"] not in METRICS:
+        raise ValueError(f"Unknown metric '{resolved['metric']}' (choose from {', '.join(METRICS)})")
+    if resolved["storage"] not in STORAGE_TYPES:
+        raise ValueError(
+            f"Unknown storage '{resolved['storage']}' (choose from {', '.join(STORAGE_TYPES)})"
+        )
+    return resolved
+
+
+def _create_faiss_index(dim, index_type, params):
+    metric = METRICS[params["metric"]]
+    storage = params["storage"]
+
+    # Flat and HNSW are wrapped in an ID map; IVF indexes store ids natively
+    if index_type == "flat":
+        if storage == "float32":
+            codes = faiss.IndexFlat(dim, metric)
+        elif storage == "pq":
+            codes = faiss.IndexPQ(dim, params["pq_m"], params["pq_nbits"], metric)
+        else:
+            codes = faiss.IndexScalarQuantizer(dim, SCALAR_QUANTIZERS[storage], metric)
+        return faiss.IndexIDMap2(codes)
+
+    if index_type == "hnsw":
+        if storage == "float32":
+            hnsw = faiss.IndexHNSWFlat(dim, params["hnsw_m"], metric)
+        elif storage == "pq":
+            hnsw = faiss.IndexHNSWPQ(dim, params["pq_m"], params["hnsw_m"], params["pq_nbits"], metric)
+        else:
+            hnsw = faiss.IndexHNSWSQ(dim, SCALAR_QUANTIZERS[storage], params["hnsw_m"], metric)
+        hnsw.hnsw.efConstruction = params["ef_construction"]
+        return faiss.IndexIDMap2(hnsw)
+
+    quantizer = faiss.IndexFlat(dim, metric)
+    if storage == "float32":
+        return faiss.IndexIVFFlat(quantizer, dim, params["nlist"], metric)
+    if storage == "pq":
+        return faiss.IndexIVFPQ(
+            quantizer, dim, params["nlist"], params["pq_m"], params["pq_nbits"], metric
+        )
+    return faiss.IndexIVFScalarQuantizer(
+        quantizer, dim, params["nlist"], SCALAR_QUANTIZERS[storage], metric
+    )
+
+
 class FAISSIndex:
-    def __init__(self, dim: int):
-        self.index = faiss.IndexFlatL2(dim)
-        self.documents = []
+    def __init__(self, dim: int, index_type: str = "flat", **params):
+        self.dim = dim
+        self.index_type = index_type
+        self.params = _resolve_params(index_type, params)
+        self.index = _create_faiss_index(dim, index_type, self.params)
+        self.documents = ChunkStore()
+        # Full-precision copies are only kept when re-ranking is enabled
+        self.exact = ExactVectors(dim) if self.params["rerank"] else None
+        self.next_id = 0
+        self._filters = {}
+        self.set_search_params()
+
+    @property
+    def supports_removal(self) -> bool:
+        # HNSW graphs cannot delete nodes; changed files need a full rebuild
+        return self.index_type != "hnsw"
+
+    def set_search_params(self, nprobe=None, ef_search=None, rerank=None):
+        """
+        Applies query-time parameters, overriding the stored ones if given.
+        """
+        if nprobe is not None:
+            self.params["nprobe"] = nprobe
+        if ef_search is not None:
+            self.params["ef_search"] = ef_search
+        if rerank is not None:
+            if rerank and self.exact is None:
+                raise ValueError(
+                    "Index has no full-precision vectors to re-rank; rebuild it with --rerank"
+                )
+            self.params["rerank"] = rerank
+
+        # Cached filter params carry their own nprobe
+        self._filters.clear()
+
+        if self.index_type in ("ivf", "ivfpq"):
+            faiss.extract_index_ivf(self.index).nprobe = self.params["nprobe"]
+        elif self.index_type == "hnsw":
+            hnsw = faiss.downcast_index(self.index.index)
+            hnsw.hnsw.efSearch = self.params["ef_search"]
+
+    def _prepare(self, embeddings):
+        vectors = np.ascontiguousarray(np.array(embeddings, dtype="float32"))
+        if self.params["metric"] == "cosine":
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def train_centroids(self) -> int:
+        """
+        Centroids train() has to fit: IVF lists, PQ codes per sub-quantizer
+        (2^pq_nbits) and, for sq8, one per quantization level.
+        """
+        if self.index.is_trained:
+            return 0
+        centroids = [self.params.get("nlist", 0)]
+        if self.params["storage"] == "pq":
+            centroids.append(2 ** self.params["pq_nbits"])
+        elif self.params["storage"] == "sq8":
+            centroids.append(256)
+        return max(centroids)
+
+    def train(self, embeddings):
+        """
+        Trains IVF / PQ / SQ codebooks. No-op for index types without training.
+        """
+        if self.index.is_trained:
+            return
+
+        vectors = self._prepare(embeddings)
+        needed = self.train_centroids()
+        if len(vectors) < needed:
+            raise ValueError(
+                f"'{self.index_type}' index with {self.params['storage']} storage needs at least "
+                f"{needed} training vectors, got {len(vectors)}; lower --nlist / --pq-nbits "
+                f"or use 'flat' with float32 / float16 storage"
+            )
+        self.index.train(vectors)
 
     def add(self, embeddings, docs):
-        self.index.add(np.array(embeddings).astype("float32"))
-        self.documents.extend(docs)
+        """
+        Adds vectors and their chunk metadata, training the index
+        on this batch first if it is still untrained.
+
+        Returns the chunk ids assigned to the new documents.
+        """
+        vectors = self._prepare(embeddings)
+        self.train(vectors)
+
+        ids = np.arange(self.next_id, self.next_id + len(docs), dtype="int64")
+        self.index.add_with_ids(vectors, ids)
+
+        self.documents.add(ids.tolist(), docs)
+        if self.exact is not None:
+            self.exact.add(ids, vectors)
+
+        self.next_id += len(docs)
+        self._filters.clear()
+        return ids.tolist()
+
+    def remove(self, ids):
+        """
+        Removes vectors and metadata for the given chunk ids.
+        """
+        if not ids:
+            return 0
 
-    def search(self, query_embedding, top_k=3):
+        if not self.supports_removal:
+            raise NotImplementedError(
+                f"'{self.index_type}' index does not support removal"
+            )
+
+        removed = self.index.remove_ids(np.array(ids, dtype="int64"))
+        self.documents.remove(ids)
+
+        self._filters.clear()
+        return removed
+
+    def _search_params(self, language=None, category=None):
+        """
+        Returns FAISS search parameters restricting the search to chunks of
+        the given language / category, or None when unfiltered.
+
+        Selectors are cached per filter and rebuilt after add/remove.
+        """
+        if language is None and category is None:
+            return None
+
+        key = (
+            language.lower() if language else None,
+            category.lower() if category else None,
+        )
+        if key not in self._filters:
+            ids = self.documents.filter_ids(*key)
+
+            selector = faiss.IDSelectorBatch(ids)
+            if self.index_type in ("ivf", "ivfpq"):
+                params = faiss.SearchParametersIVF(sel=selector, nprobe=self.params["nprobe"])
+            else:
+                params = faiss.SearchParameters(sel=selector)
+
+            # Keep the selector alive alongside the params that point to it
+            self._filters[key] = (params, selector, len(ids))
+
+        return self._filters[key]
+
+    def _rerank(self, queries, indices, top_k):
+        """
+        Exact distances for each query's shortlist, best top_k first.
+        """
+        distances = np.full((len(queries), top_k), np.inf, dtype="float32")
+        result = np.full((len(queries), top_k), -1, dtype="int64")
+
+        for row, (query, shortlist) in enumerate(zip(queries, indices)):
+            shortlist = shortlist[shortlist != -1]
+            if not len(shortlist):
+                continue
+            vectors = self.exact.get(shortlist)
+            if self.params["metric"] == "cosine":
+                exact = 1.0 - vectors @ query
+            else:
+                exact = np.sum((vectors - query) ** 2, axis=1)
+            order = np.argsort(exact, kind="stable")[:top_k]
+            distances[row, :len(order)] = exact[order]
+            result[row, :len(order)] = shortlist[order]
+
+        return distances, result
+
+    def search_ids(self, query_embeddings, top_k=3, language=None, category=None):
+        """
+        Batch search returning (distances, ids) arrays of shape
+        (queries, top_k); missing results have id -1. Distances are
+        squared L2, or 1 - cosine similarity for the cosine metric.
+        """
+        queries = self._prepare(query_embeddings)
+
+        search_filter = self._search_params(language, category)
+        params = None
+        if search_filter is not None:
+            params, _, allowed = search_filter
+            if allowed == 0:
+                empty = np.zeros((len(queries), 0))
+                return empty.astype("float32"), empty.astype("int64")
+
+        rerank = self.params["rerank"] if self.exact is not None else 0
         distances, indices = self.index.search(
-            np.array([query_embedding]).astype("float32"),
-            top_k
+            queries,
+            top_k * rerank if rerank else top_k,
+            params=params
+        )
+
+        if rerank:
+            return self._rerank(queries, indices, top_k)
+        if self.params["metric"] == "cosine":
+            distances = 1.0 - distances
+        return distances, indices
+
+    def search(self, query_embedding, top_k=3, language=None, category=None):
+        """
+        Returns up to top_k chunks nearest to the query, each with its
+        "id" and "distance". language / category filter inside the FAISS
+        search, so k matching chunks come back without over-fetching.
+        """
+        distances, indices = self.search_ids(
+            np.array([query_embedding]), top_k, language=language, category=category
         )
-        return [self.documents[i] for i in indices[0]]
+
+        return [
+            {**self.documents[i], "id": i, "distance": float(d)}
+            for d, i in zip(distances[0].tolist(), indices[0].tolist())
+            if i != -1
+        ]
+
+    def save(self, path=DEFAULT_INDEX_DIR, manifest=None, compress_text=None):
+        """
+        Writes the index in the versioned on-disk format. compress_text
+        zlib-compresses chunk texts (default: keep the current setting).
+
+        meta.json is written last, so a partially written directory
+        is never picked up as a valid index.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        meta = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "dim": self.dim,
+            "count": len(self.documents),
+            "next_id": self.next_id,
+            "index_type": self.index_type,
+            "params": self.params,
+        }
+
+        write_atomic(
+            path / INDEX_FILE,
+            lambda p: faiss.write_index(self.index, str(p))
+        )
+        self.documents.save(path, compress=compress_text)
+        if self.exact is not None:
+            live_ids = np.fromiter(self.documents, dtype="int64", count=len(self.documents))
+            self.exact.save(path, live_ids)
+        else:
+            remove_exact_vectors(path)
+        if manifest is not None:
+            write_atomic(
+                path / MANIFEST_FILE,
+                lambda p: p.write_text(json.dumps(manifest), encoding="utf-8")
+            )
+        write_atomic(
+            path / META_FILE,
+            lambda p: p.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        )
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_DIR, mmap=True):
+        """
+        Opens an index written by save().
+
+        With mmap=True the FAISS data and the chunk store are
+        memory-mapped read-only, so worker processes share pages
+        instead of each holding a copy.
+        Use mmap=False when the index will be modified.
+        """
+        path = Path(path)
+        meta_path = path / META_FILE
+
+        if not meta_path.exists():
+            raise IndexFormatError(
+                f"No index found at '{path}'. Run `python -m vectorstore.build_index` first."
+            )
+
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        version = meta.get("format_version")
+        if version != INDEX_FORMAT_VERSION:
+            raise IndexFormatError(
+                f"Unsupported index format version {version} "
+                f"(expected {INDEX_FORMAT_VERSION}); rebuild the index."
+            )
+
+        flags = _mmap_flags() if mmap else 0
+
+        obj = cls.__new__(cls)
+        obj.dim = meta["dim"]
+        obj.next_id = meta["next_id"]
+        obj.index_type = meta["index_type"]
+        obj.params = _resolve_params(obj.index_type, meta.get("params", {}))
+        obj.index = faiss.read_index(str(path / INDEX_FILE), flags)
+        obj.exact = ExactVectors.load(path, mmap=mmap)
+        obj._filters = {}
+        obj.set_search_params()
+
+        obj.documents = ChunkStore.load(path, mmap=mmap)
+
+        if obj.index.ntotal != len(obj.documents):
+            raise IndexFormatError(
+                f"Index has {obj.index.ntotal} vectors but {len(obj.documents)} documents"
+            )
+        if obj.exact is not None and len(obj.exact) != obj.index.ntotal:
+            raise IndexFormatError(
+                f"Index has {obj.index.ntotal} vectors but {len(obj.exact)} full-precision copies"
+            )
+
+        return obj
+
+
+def load_manifest(path=DEFAULT_INDEX_DIR):
+    """
+    Returns the build manifest stored next to the index, or None.
+    """
+    manifest_path = Path(path) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    return json.loads(manifest_path.read_text(encoding="utf-8"))
@@ -0,0 +1,228 @@
+import re
+from pathlib import Path
+
+import numpy as np
+
+from utils.fileio import write_atomic
+from vectorstore.faiss_index import DEFAULT_INDEX_DIR
+
+LEXICAL_FILE = "lexical.npz"
+
+# Identifiers and numbers; punctuation carries no lexical signal
+WORD_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+# camelCase / PascalCase / ACRONYMWord pieces
+CAMEL_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize_code(text: str):
+    """
+    Code-aware tokens: identifiers are split on snake_case and camelCase
+    and lowercased; compound identifiers are also kept whole, so exact
+    names score higher than their parts.
+    """
+    tokens = []
+    for word in WORD_PATTERN.findall(text):
+        parts = [
+            part.lower()
+            for piece in word.split("_")
+            for part in CAMEL_PATTERN.findall(piece)
+        ]
+        tokens.extend(p for p in parts if len(p) > 1)
+        if len(parts) > 1:
+            tokens.append(word.lower())
+    return tokens
+
+
+def _encode_column(values):
+    """
+    Int-codes a string column: returns (codes, vocabulary), with
+    lowercased values so filters match case-insensitively.
+    """
+    vocabulary = sorted({str(v or "").lower() for v in values})
+    lookup = {v: i for i, v in enumerate(vocabulary)}
+    codes = np.array([lookup[str(v or "").lower()] for v in values], dtype="int32")
+    return codes, vocabulary
+
+
+class BM25Index:
+    """
+    BM25 inverted index over code-aware tokens, built alongside the
+    FAISS index from the same chunks.
+
+    Postings are stored CSR-style in flat numpy arrays (term offsets,
+    row ids, term frequencies), so the index is compact on disk and a
+    query only touches the postings of its own terms.
+    """
+
+    def __init__(self, terms, offsets, rows, freqs, doc_lengths, chunk_ids,
+                 language_codes, languages, category_codes, categories):
+        self.terms = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.rows = rows
+        self.freqs = freqs
+        self.doc_lengths = doc_lengths
+        self.chunk_ids = chunk_ids
+        self.language_codes = language_codes
+        self.languages = {v: i for i, v in enumerate(languages)}
+        self.category_codes = category_codes
+        self.categories = {v: i for i, v in enumerate(categories)}
+        self._masks = {}
+
+        n_docs = len(chunk_ids)
+        doc_freqs = np.diff(offsets).astype("float32")
+        self.idf = np.log1p((n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype("float32")
+
+        avg_length = float(doc_lengths.mean()) if n_docs else 0.0
+        # Per-row length normalization, precomputed once
+        self.norms = (
+            BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / max(avg_length, 1.0))
+        ).astype("float32")
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    @classmethod
+    def build(cls, documents):
+        """
+        Builds the index from FAISSIndex.documents (chunk id -> chunk).
+        """
+        chunk_ids = sorted(documents)
+        postings = {}
+        doc_lengths = np.zeros(len(chunk_ids), dtype="float32")
+        languages, categories = [], []
+
+        for row, chunk_id in enumerate(chunk_ids):
+            # One lookup per chunk: stored texts are decoded on access
+            doc = documents[chunk_id]
+            languages.append(doc.get("language"))
+            categories.append(doc.get("category"))
+
+            tokens = tokenize_code(doc["text"])
+            doc_lengths[row] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((row, count))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype="int64")
+        offsets[1:] = np.cumsum([len(postings[t]) for t in terms])
+        rows = np.array(
+            [row for t in terms for row, _ in postings[t]], dtype="int32"
+        )
+        freqs = np.array(
+            [min(count, 65535) for t in terms for _, count in postings[t]], dtype="uint16"
+        )
+
+        language_codes, languages = _encode_column(languages)
+        category_codes, categories = _encode_column(categories)
+
+        return cls(
+            terms, offsets, rows, freqs, doc_lengths,
+            np.array(chunk_ids, dtype="int64"),
+            language_codes, languages, category_codes, categories,
+        )
+
+    def _mask(self, language=None, category=None):
+        """
+        Boolean row mask for a language / category filter, cached per
+        filter; None when unfiltered.
+        """
+        if language is None and category is None:
+            return None
+
+        key = (
+            language.lower() if language else None,
+            category.lower() if category else None,
+        )
+        if key not in self._masks:
+            mask = np.ones(len(self), dtype=bool)
+            if key[0] is not None:
+                mask &= self.language_codes == self.languages.get(key[0], -1)
+            if key[1] is not None:
+                mask &= self.category_codes == self.categories.get(key[1], -1)
+            self._masks[key] = mask
+
+        return self._masks[key]
+
+    def search(self, query: str, top_k=10, language=None, category=None):
+        """
+        Returns up to top_k (chunk_id, score) pairs, best first.
+        Chunks sharing no term with the query are never returned.
+        """
+        term_ids = {self.terms[t] for t in tokenize_code(query) if t in self.terms}
+        if not term_ids or top_k <= 0:
+            return []
+
+        scores = np.zeros(len(self), dtype="float32")
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            rows = self.rows[start:end]
+            tf = self.freqs[start:end].astype("float32")
+            # Rows are unique within one posting list
+            scores[rows] += self.idf[term_id] * tf * (BM25_K1 + 1) / (tf + self.norms[rows])
+
+        mask = self._mask(language, category)
+        if mask is not None:
+            scores[~mask] = 0.0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top_k:
+            top = np.argpartition(-scores[candidates], top_k - 1)[:top_k]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        return [
+            (int(self.chunk_ids[row]), float(scores[row]))
+            for row in candidates
+        ]
+
+    def save(self, path=DEFAULT_INDEX_DIR):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        terms = sorted(self.terms, key=self.terms.get)
+        arrays = {
+            "terms": np.array(terms, dtype=str),
+            "offsets": self.offsets,
+            "rows": self.rows,
+            "freqs": self.freqs,
+            "doc_lengths": self.doc_lengths,
+            "chunk_ids": self.chunk_ids,
+            "language_codes": self.language_codes,
+            "languages": np.array(sorted(self.languages, key=self.languages.get), dtype=str),
+            "category_codes": self.category_codes,
+            "categories": np.array(sorted(self.categories, key=self.categories.get), dtype=str),
+        }
+
+        def write(p):
+            with open(p, "wb") as f:
+                np.savez_compressed(f, **arrays)
+
+        write_atomic(path / LEXICAL_FILE, write)
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_DIR):
+        with np.load(Path(path) / LEXICAL_FILE, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+
+        return cls(
+            arrays["terms"].tolist(), arrays["offsets"], arrays["rows"], arrays["freqs"],
+            arrays["doc_lengths"], arrays["chunk_ids"],
+            arrays["language_codes"], arrays["languages"].tolist(),
+            arrays["category_codes"], arrays["categories"].tolist(),
+        )
+
+
+def load_lexical_index(path=DEFAULT_INDEX_DIR):
+    """
+    Returns the BM25 index stored next to the FAISS index, or None
+    for indexes built before lexical search existed.
+    """
+    if not (Path(path) / LEXICAL_FILE).exists():
+        return None
+    return BM25Index.load(path)
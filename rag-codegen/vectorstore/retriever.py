@@ -1,6 +1,65 @@
+# Reciprocal rank fusion constant; 60 is the usual default from the RRF paper
+RRF_K = 60
+
+
 class Retriever:
-    def __init__(self, index):
+    """
+    Retrieves chunks by vector similarity, fused with BM25 lexical
+    matches when a lexical index is available.
+
+    Exact identifiers and keywords are caught by BM25, so the vector
+    side only needs a small candidate list (vector_k).
+    """
+
+    def __init__(self, index, lexical=None, vector_k=5, lexical_k=10, rrf_k=RRF_K):
         self.index = index
+        self.lexical = lexical
+        self.vector_k = vector_k
+        self.lexical_k = lexical_k
+        self.rrf_k = rrf_k
+
+    def retrieve(self, query_embedding, top_k=3, language=None, category=None, query_text=None):
+        if self.lexical is None or not query_text:
+            return self.index.search(
+                query_embedding,
+                top_k,
+                language=language,
+                category=category
+            )
+
+        vector_hits = self.index.search(
+            query_embedding,
+            max(top_k, self.vector_k),
+            language=language,
+            category=category
+        )
+        lexical_hits = self.lexical.search(
+            query_text,
+            max(top_k, self.lexical_k),
+            language=language,
+            category=category
+        )
+
+        return self._fuse(vector_hits, lexical_hits, top_k)
+
+    def _fuse(self, vector_hits, lexical_hits, top_k):
+        """
+        Reciprocal rank fusion: each list contributes 1 / (rrf_k + rank),
+        so only ranks matter and BM25 / L2 scales never need calibrating.
+        """
+        fused = {}
+
+        for rank, hit in enumerate(vector_hits, start=1):
+            fused[hit["id"]] = {**hit, "rrf_score": 1.0 / (self.rrf_k + rank)}
+
+        for rank, (chunk_id, score) in enumerate(lexical_hits, start=1):
+            doc = self.index.documents.get(chunk_id)
+            if doc is None:
+                # Lexical index is stale for this chunk
+                continue
+            entry = fused.setdefault(chunk_id, {**doc, "id": chunk_id, "rrf_score": 0.0})
+            entry["bm25"] = score
+            entry["rrf_score"] += 1.0 / (self.rrf_k + rank)
 
-    def retrieve(self, query_embedding, top_k=3):
-        return self.index.search(query_embedding, top_k)
+        ranked = sorted(fused.values(), key=lambda hit: hit["rrf_score"], reverse=True)
+        return ranked[:top_k]